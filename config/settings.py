@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+from datetime import date
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -77,6 +79,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Pointages concurrents: le verrou d'écriture est pris dès BEGIN (pas de
+            # "database is locked" à la promotion du verrou), WAL laisse lire pendant l'écriture.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
     }
 }
 
@@ -112,6 +121,26 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Jeton partagé des terminaux de pointage (en-tête X-Terminal-Token).
+# Vide: l'endpoint de pointage refuse toutes les requêtes.
+PUNCH_TERMINAL_TOKEN = os.environ.get('PUNCH_TERMINAL_TOKEN', '')
+
+# Jeton partagé du système de paie externe pour le flux de changements (en-tête X-Feed-Token).
+# Vide: le flux refuse toutes les requêtes.
+CHANGE_FEED_TOKEN = os.environ.get('CHANGE_FEED_TOKEN', '')
+
+# Tests de charge (http_loadtest, punch_loadtest, export_benchmark): ils écrivent puis suppriment
+# des données synthétiques, journalisées dans le flux de changements lu par la paie.
+# Ils refusent de s'exécuter sauf sur une base jetable déclarée ici (LOADTEST_SCRATCH_DATABASE=1).
+LOADTEST_SCRATCH_DATABASE = os.environ.get('LOADTEST_SCRATCH_DATABASE', '') == '1'
+
+
+# Périodes de paie: blocs de PAY_PERIOD_WEEKS semaines à partir de ce lundi.
+# Stockées dans le calendrier: après modification, lancer `manage.py build_calendar`.
+PAY_PERIOD_ANCHOR = date(2024, 1, 1)
+PAY_PERIOD_WEEKS = 2
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
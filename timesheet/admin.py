@@ -1,16 +1,83 @@
 from django.contrib import admin
-from .models import Employee, WeeklyTimesheet, DailyEntry
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.template.response import TemplateResponse
+from .models import Employee, WeeklyTimesheet, DailyEntry, ChangeLogEntry
+from .purge import purge_timesheets
+from .weeks import load_weeks
 
 # Register your models here.
 
 
+def purge_confirmation(modeladmin, request, queryset, action, summary):
+    """Page intermédiaire des purges, comme l'action delete_selected de Django (POST post=yes pour confirmer)."""
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        "title": "Confirmer la suppression",
+        "opts": modeladmin.model._meta,
+        "queryset": queryset,
+        "summary": summary,
+        "action": action,
+        "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        "media": modeladmin.media,
+    }
+    request.current_app = modeladmin.admin_site.name
+    return TemplateResponse(request, "admin/timesheet/purge_confirmation.html", context)
+
+
+class BatchDeleteAdmin(admin.ModelAdmin):
+    """
+    Suppressions de l'admin passées par purge_timesheets (lots courts) au lieu de la cascade
+    complète du Collector. delete_selected, dont la page de confirmation charge aussi toute
+    la cascade, est remplacée par l'action de purge du modèle.
+    """
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def purge(self, queryset):
+        raise NotImplementedError
+
+    def delete_model(self, request, obj):
+        self.purge(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.purge(queryset)
+
+
 
 @admin.register(Employee)
-class EmployeeAdmin(admin.ModelAdmin):
+class EmployeeAdmin(BatchDeleteAdmin):
     list_display = ("name", "is_active", "created_at")
     list_filter = ("is_active",)
     search_fields = ("name",)
     ordering = ("name",)
+    actions = ["purge_with_history"]
+
+    @admin.action(description="Supprimer les employés et leur historique (par lots)", permissions=["delete"])
+    def purge_with_history(self, request, queryset):
+        history = WeeklyTimesheet.objects.filter(employee__in=queryset)
+        if not request.POST.get("post"):
+            return purge_confirmation(self, request, queryset, "purge_with_history", [
+                ("Employés", queryset.count()),
+                ("Feuilles de temps", history.count()),
+                ("Entrées journalières", DailyEntry.objects.filter(timesheet__in=history).count()),
+            ])
+
+        self.log_deletions(request, queryset)
+        employees, timesheets, entries = self.purge(queryset)
+        self.message_user(request, f"{employees} employé(s), {timesheets} feuille(s) et {entries} entrée(s) supprimés.")
+
+    def purge(self, queryset):
+        # Historique supprimé par lots d'abord: la cascade finale n'a plus rien à charger
+        timesheets, entries = purge_timesheets(WeeklyTimesheet.objects.filter(employee__in=queryset))
+        employees = 0
+        for employee in queryset:
+            employee.delete()
+            employees += 1
+        return employees, timesheets, entries
 
 class DailyEntryInline(admin.TabularInline):
     model = DailyEntry
@@ -18,15 +85,65 @@ class DailyEntryInline(admin.TabularInline):
     max_num = 7
 
 
+class WeeklyTimesheetChangeList(ChangeList):
+    # Totaux de la page calculés en deux requêtes au lieu d'une requête d'entrées par ligne
+    def get_results(self, request):
+        super().get_results(request)
+        weeks = {w.timesheet_id: w for w in load_weeks(WeeklyTimesheet.objects.filter(pk__in=[ts.pk for ts in self.result_list]))}
+        for ts in self.result_list:
+            ts.week = weeks[ts.pk]
+
+
 @admin.register(WeeklyTimesheet)
-class WeeklyTimesheetAdmin(admin.ModelAdmin):
+class WeeklyTimesheetAdmin(BatchDeleteAdmin):
     list_display = ("employee", "week_start", "total_hours", "created_at")
     list_filter = ("week_start",)
-    search_fields = ("employee__name",)    
+    list_select_related = ("employee",)
+    search_fields = ("employee__name",)
+    actions = ["purge_selected"]
+
+    def get_changelist(self, request, **kwargs):
+        return WeeklyTimesheetChangeList
+
+    @admin.display(description="Total (h)")
+    def total_hours(self, obj):
+        return obj.week.total_hours_decimal
+
+    @admin.action(description="Supprimer les feuilles sélectionnées (par lots)", permissions=["delete"])
+    def purge_selected(self, request, queryset):
+        queryset = queryset.select_related("employee")
+        if not request.POST.get("post"):
+            return purge_confirmation(self, request, queryset, "purge_selected", [
+                ("Feuilles de temps", queryset.count()),
+                ("Entrées journalières", DailyEntry.objects.filter(timesheet__in=queryset).count()),
+            ])
+
+        self.log_deletions(request, queryset)
+        timesheets, entries = self.purge(queryset)
+        self.message_user(request, f"{timesheets} feuille(s) et {entries} entrée(s) supprimées.")
+
+    def purge(self, queryset):
+        return purge_timesheets(queryset)
 
 
 @admin.register(DailyEntry)
 class DailyEntryAdmin(admin.ModelAdmin):
     list_display = ("timesheet", "day", "total_minutes")
     list_filter = ("day",)
-    search_fields = ("timesheet__employee__name",)
\ No newline at end of file
+    search_fields = ("timesheet__employee__name",)
+
+
+@admin.register(ChangeLogEntry)
+class ChangeLogEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "action", "model", "object_pk", "created_at")
+    list_filter = ("action", "model")
+
+    # Journal append-only: lecture seule dans l'admin
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,129 @@
+"""
+Détection d'anomalies en SQL ensembliste, par tranches de clé primaire.
+Aucune instance de modèle n'est chargée: chaque requête ne renvoie que les lignes fautives.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.db.models import Exists, F, OuterRef, Q
+
+from .models import AnomalyScan, DailyEntry, WeeklyTimesheet
+from .periods import worked_duration
+
+DEFAULT_CHUNK_SIZE = 10_000
+DEFAULT_LONG_DAY_HOURS = 16
+DEFAULT_EXAMPLES_PER_KIND = 50
+
+ANOMALY_LABELS = {
+    "half_filled": "Bloc à moitié rempli",
+    "out_of_order": "Heures dans le désordre",
+    "evening_before_lunch_return": "Arrivée soir avant le retour dîner",
+    "long_day": "Journée anormalement longue",
+    "empty_week": "Semaine sans heures saisies",
+    "week_start_not_monday": "Début de semaine autre qu’un lundi",
+}
+
+
+class Anomaly(NamedTuple):
+    kind: str
+    timesheet_id: int
+    entry_id: int | None
+    employee: str
+    week_start: object
+    day: str | None
+
+
+def _entry_checks(long_day: timedelta) -> dict[str, tuple[Q, dict]]:
+    def pair_broken(a: str, b: str) -> Q:
+        return Q(**{f"{a}__isnull": True, f"{b}__isnull": False}) | Q(**{f"{a}__isnull": False, f"{b}__isnull": True})
+
+    return {
+        "half_filled": (
+            pair_broken("arrival_morning", "lunch_departure")
+            | pair_broken("lunch_departure", "lunch_return")
+            | pair_broken("arrival_evening", "departure_evening"),
+            {},
+        ),
+        "out_of_order": (
+            Q(arrival_morning__gte=F("lunch_departure"))
+            | Q(lunch_departure__gte=F("lunch_return"))
+            | Q(arrival_evening__gte=F("departure_evening")),
+            {},
+        ),
+        "evening_before_lunch_return": (Q(arrival_evening__lt=F("lunch_return")), {}),
+        "long_day": (
+            Q(worked__gt=long_day),
+            {"worked": worked_duration()},
+        ),
+    }
+
+
+def _timesheet_checks() -> dict[str, Q]:
+    has_hours = DailyEntry.objects.filter(timesheet=OuterRef("pk")).filter(
+        Q(arrival_morning__isnull=False)
+        | Q(lunch_departure__isnull=False)
+        | Q(lunch_return__isnull=False)
+        | Q(arrival_evening__isnull=False)
+        | Q(departure_evening__isnull=False)
+    )
+    return {
+        "empty_week": ~Exists(has_hours),
+        "week_start_not_monday": ~Q(week_start__iso_week_day=1),
+    }
+
+
+def _pk_ranges(model, chunk_size: int) -> Iterator[tuple[int, int]]:
+    last = model.objects.order_by("-pk").values_list("pk", flat=True).first()
+    if last is None:
+        return
+    lo = model.objects.order_by("pk").values_list("pk", flat=True).first()
+    while lo <= last:
+        yield lo, lo + chunk_size
+        lo += chunk_size
+
+
+def scan(
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    long_day_hours: int = DEFAULT_LONG_DAY_HOURS,
+) -> Iterator[Anomaly]:
+    assert chunk_size >= 1, "chunk_size doit être au moins 1"
+    entry_checks = _entry_checks(timedelta(hours=long_day_hours))
+    for lo, hi in _pk_ranges(DailyEntry, chunk_size):
+        chunk = DailyEntry.objects.filter(pk__gte=lo, pk__lt=hi).order_by("pk")
+        for kind, (condition, annotations) in entry_checks.items():
+            rows = chunk.annotate(**annotations).filter(condition).values_list(
+                "timesheet_id", "pk", "timesheet__employee__name", "timesheet__week_start", "day",
+            )
+            for row in rows:
+                yield Anomaly(kind, *row)
+
+    timesheet_checks = _timesheet_checks()
+    for lo, hi in _pk_ranges(WeeklyTimesheet, chunk_size):
+        chunk = WeeklyTimesheet.objects.filter(pk__gte=lo, pk__lt=hi).order_by("pk")
+        for kind, condition in timesheet_checks.items():
+            for ts_id, name, week_start in chunk.filter(condition).values_list("pk", "employee__name", "week_start"):
+                yield Anomaly(kind, ts_id, None, name, week_start, None)
+
+
+def save_scan(report: list[dict], started_at, long_day_hours: int) -> AnomalyScan:
+    """Enregistre le résumé (exemples compris) pour la page des anomalies."""
+    return AnomalyScan.objects.create(
+        started_at=started_at,
+        long_day_hours=long_day_hours,
+        total=sum(row["count"] for row in report),
+        report=[{**row, "examples": [a._asdict() for a in row["examples"]]} for row in report],
+    )
+
+
+def summarize(anomalies, examples_per_kind: int = DEFAULT_EXAMPLES_PER_KIND) -> list[dict]:
+    """Compte par type et conserve les premiers exemples (mémoire bornée)."""
+    report = {kind: {"kind": kind, "label": label, "count": 0, "examples": []} for kind, label in ANOMALY_LABELS.items()}
+    for anomaly in anomalies:
+        row = report[anomaly.kind]
+        row["count"] += 1
+        if len(row["examples"]) < examples_per_kind:
+            row["examples"].append(anomaly)
+    return list(report.values())
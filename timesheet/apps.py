@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TimesheetConfig(AppConfig):
     name = 'timesheet'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,14 +1,34 @@
 from django import forms
-from .models import WeeklyTimesheet, DailyEntry
+from django.urls import reverse
+from .models import Employee, WeeklyTimesheet, DailyEntry
 from django.forms import modelformset_factory
 from datetime import timedelta
 
 
+class EmployeeSearchWidget(forms.Widget):
+    """
+    Remplace le <select> de tous les employés par une autocomplétion
+    sur timesheet:employee_search. Seul l'employé sélectionné est chargé.
+    """
+    template_name = "timesheet/widgets/employee_search.html"
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ""
+        # Valeur brute du POST: ne chercher le libellé que pour un id plausible
+        if value and str(value).isdigit():
+            label = Employee.objects.filter(pk=value).values_list("name", flat=True).first() or ""
+        context["widget"]["label"] = label
+        context["widget"]["search_url"] = reverse("timesheet:employee_search")
+        return context
+
+
 class WeeklyTimesheetForm(forms.ModelForm):
     class Meta:
         model = WeeklyTimesheet
         fields = ["employee", "week_start"]
         widgets = {
+            "employee": EmployeeSearchWidget(),
             "week_start": forms.DateInput(attrs={"type": "date"}),
         }
 
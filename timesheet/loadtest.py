@@ -0,0 +1,84 @@
+"""Outils communs des tests de charge: serveur WSGI local, session connectée, percentiles et histogramme de latences."""
+from __future__ import annotations
+
+import math
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.middleware.csrf import CSRF_ALLOWED_CHARS
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+# Bornes supérieures des classes de l'histogramme, en millisecondes
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def setup(self):
+        super().setup()
+        # En-têtes et corps partent en deux écritures: sans TCP_NODELAY, Nagle et l'ACK retardé
+        # du client ajoutent ~40 ms à chaque réponse sur une connexion persistante
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def require_scratch_database() -> None:
+    """Les données synthétiques passeraient dans le flux de changements: base jetable obligatoire."""
+    if not settings.LOADTEST_SCRATCH_DATABASE:
+        raise CommandError(
+            "Test de charge refusé: la base n'est pas déclarée jetable. Lancer sur une copie de la base "
+            "avec LOADTEST_SCRATCH_DATABASE=1 (avec --url, le serveur doit utiliser la même copie)."
+        )
+
+
+def start_local_server() -> ThreadedWSGIServer:
+    """Application WSGI sur un port libre de 127.0.0.1, servie dans un thread (shutdown() pour l'arrêter)."""
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler)
+    server.set_app(get_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def session_headers(user) -> dict[str, str]:
+    """En-têtes d'un client connecté (cookie de session en base et jeton CSRF), pour http.client."""
+    client = Client()
+    client.force_login(user)
+    session_id = client.cookies[settings.SESSION_COOKIE_NAME].value
+    csrf_secret = get_random_string(32, CSRF_ALLOWED_CHARS)
+    return {
+        "Cookie": f"{settings.SESSION_COOKIE_NAME}={session_id}; {settings.CSRF_COOKIE_NAME}={csrf_secret}",
+        "X-CSRFToken": csrf_secret,
+    }
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Percentile au rang le plus proche: la plus petite valeur dont au moins p des valeurs sont <= elle."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(round(p * len(sorted_values), 9))  # round: 0.07 * 100 = 7.000000000000001
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    """Résumé JSON-sérialisable d'une liste de latences (secondes)."""
+    ms = sorted(x * 1000 for x in latencies)
+    histogram = {f"<={b}ms": 0 for b in HISTOGRAM_BOUNDS_MS}
+    histogram[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] = 0
+    for x in ms:
+        bucket = next((f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS if x <= b), f">{HISTOGRAM_BOUNDS_MS[-1]}ms")
+        histogram[bucket] += 1
+    return {
+        "count": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 0.50), 2),
+        "p95_ms": round(percentile(ms, 0.95), 2),
+        "p99_ms": round(percentile(ms, 0.99), 2),
+        "max_ms": round(ms[-1], 2) if ms else 0.0,
+        "histogram": histogram,
+    }
@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from timesheet.periods import DEFAULT_CALENDAR_END, DEFAULT_CALENDAR_START, build_calendar
+
+
+class Command(BaseCommand):
+    help = "Remplit (ou prolonge) la dimension calendrier: semaines et jours avec semaine ISO, mois, trimestre et période de paie."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, default=DEFAULT_CALENDAR_START)
+        parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_CALENDAR_END)
+
+    def handle(self, *args, **options):
+        if options["end"] < options["start"]:
+            raise CommandError("--end doit être postérieur à --start.")
+        weeks, days = build_calendar(options["start"], options["end"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Calendrier à jour du {options['start']} au {options['end']} ({weeks} semaines, {days} jours)."
+        ))
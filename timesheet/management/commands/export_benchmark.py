@@ -0,0 +1,191 @@
+import http.client
+import json
+import socket
+import threading
+import time
+from datetime import date, time as dtime, timedelta
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from timesheet.loadtest import latency_summary, require_scratch_database, session_headers
+from timesheet.models import DailyEntry, Employee, WeeklyTimesheet
+from timesheet.purge import purge_timesheets
+
+BENCH_PREFIX = "__export_benchmark__"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare un déploiement WSGI et ASGI: N clients connectés téléchargent lentement l'export CSV "
+        "pendant que des clients interactifs mesurent la latence des pages. "
+        "Lancer le serveur à part, par exemple:\n"
+        "  gunicorn config.wsgi -w 1 --threads 4 -b 127.0.0.1:8001\n"
+        "  uvicorn config.asgi:application --workers 1 --port 8002\n"
+        "puis: manage.py export_benchmark --url http://127.0.0.1:8001 (puis 8002)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", required=True)
+        parser.add_argument("--downloads", type=int, default=16, help="Téléchargements lents simultanés.")
+        parser.add_argument("--read-bytes", type=int, default=16 * 1024, help="Octets lus par itération.")
+        parser.add_argument("--read-interval", type=float, default=0.1, help="Pause entre deux lectures (s).")
+        parser.add_argument("--probes", type=int, default=2, help="Clients interactifs simultanés.")
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument("--employees", type=int, default=200, help="Données générées pour grossir l'export.")
+        parser.add_argument("--weeks", type=int, default=52)
+        parser.add_argument("--keep", action="store_true", help="Conserver les données générées.")
+
+    def handle(self, *args, **options):
+        require_scratch_database()
+        self._create_fixtures(options["employees"], options["weeks"])
+        try:
+            report = self._run(options)
+        finally:
+            if not options["keep"]:
+                employees = Employee.objects.filter(name__startswith=BENCH_PREFIX)
+                purge_timesheets(WeeklyTimesheet.objects.filter(employee__in=employees))
+                employees.delete()
+                get_user_model().objects.filter(username=BENCH_PREFIX).delete()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _create_fixtures(self, n_employees, n_weeks):
+        # bulk_create: seul le volume de l'export compte ici
+        employees = Employee.objects.bulk_create(
+            Employee(name=f"{BENCH_PREFIX} {i:05d}", search_name=f"{BENCH_PREFIX} {i:05d}")
+            for i in range(n_employees)
+        )
+        this_monday = date.today() - timedelta(days=date.today().weekday())
+        timesheets = WeeklyTimesheet.objects.bulk_create(
+            WeeklyTimesheet(employee=emp, week_start=this_monday - timedelta(weeks=w))
+            for emp in employees
+            for w in range(1, n_weeks + 1)
+        )
+        DailyEntry.objects.bulk_create(
+            (
+                DailyEntry(
+                    timesheet=ts,
+                    day=weekday,
+                    day_order=weekday.day_order,
+                    work_date_id=weekday.date_in(ts.week_start),
+                    arrival_morning=dtime(8),
+                    lunch_departure=dtime(12),
+                    lunch_return=dtime(12, 30),
+                    arrival_evening=dtime(13),
+                    departure_evening=dtime(16, 30),
+                )
+                for ts in timesheets
+                for weekday in list(DailyEntry.Weekday)[:5]  # lundi à vendredi
+            ),
+            batch_size=2000,
+        )
+
+    def _run(self, options):
+        parts = urlsplit(options["url"].rstrip("/"))
+        host, port = parts.hostname, parts.port or 80
+        deadline = time.perf_counter() + options["duration"]
+        lock = threading.Lock()
+        downloads = {"started": 0, "completed": 0, "bytes": 0, "ttfb": [], "errors": 0, "max_in_flight": 0}
+        in_flight = [0]
+        probe_paths = [
+            reverse("timesheet:home"),
+            reverse("timesheet:employee_list"),
+            # Vues async: sous ASGI, elles ne bloquent pas de thread pendant les requêtes
+            reverse("timesheet:timesheet_list"),
+            reverse("timesheet:payroll_summary"),
+        ]
+        probe_latencies = {path: [] for path in probe_paths}
+        probe_errors = [0]
+        probes_sent = [0]
+        export_path = reverse("timesheet:export_timesheets_csv")
+        # Session en base, partagée avec le serveur cible (même base de données)
+        headers = session_headers(get_user_model().objects.get_or_create(username=BENCH_PREFIX)[0])
+
+        def slow_downloader():
+            while time.perf_counter() < deadline:
+                conn = http.client.HTTPConnection(host, port, timeout=120)
+                try:
+                    conn.connect()
+                    # Petit tampon de réception: le serveur subit la lenteur du client
+                    conn.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+                    t0 = time.perf_counter()
+                    conn.request("GET", export_path, headers=headers)
+                    resp = conn.getresponse()
+                    ttfb = time.perf_counter() - t0
+                    with lock:
+                        downloads["started"] += 1
+                        downloads["ttfb"].append(ttfb)
+                        in_flight[0] += 1
+                        downloads["max_in_flight"] = max(downloads["max_in_flight"], in_flight[0])
+                    try:
+                        while chunk := resp.read(options["read_bytes"]):
+                            with lock:
+                                downloads["bytes"] += len(chunk)
+                            time.sleep(options["read_interval"])
+                    finally:
+                        with lock:
+                            in_flight[0] -= 1
+                    with lock:
+                        if resp.status == 200:
+                            downloads["completed"] += 1
+                        else:
+                            downloads["errors"] += 1
+                except (OSError, http.client.HTTPException):
+                    with lock:
+                        downloads["errors"] += 1
+                finally:
+                    conn.close()
+
+        def probe():
+            i = 0
+            while time.perf_counter() < deadline:
+                path = probe_paths[i % len(probe_paths)]
+                i += 1
+                conn = http.client.HTTPConnection(host, port, timeout=120)
+                with lock:
+                    probes_sent[0] += 1
+                t0 = time.perf_counter()
+                try:
+                    conn.request("GET", path)
+                    resp = conn.getresponse()
+                    resp.read()
+                    with lock:
+                        probe_latencies[path].append(time.perf_counter() - t0)
+                        if resp.status >= 400:
+                            probe_errors[0] += 1
+                except (OSError, http.client.HTTPException):
+                    with lock:
+                        probe_errors[0] += 1
+                finally:
+                    conn.close()
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=slow_downloader, daemon=True) for _ in range(options["downloads"])]
+        threads += [threading.Thread(target=probe, daemon=True) for _ in range(options["probes"])]
+        for th in threads:
+            th.start()
+        for th in threads:
+            # Les téléchargements en cours à l'échéance sont abandonnés (comptés comme démarrés)
+            th.join(timeout=max(0.0, deadline - time.perf_counter()) + 1)
+
+        interactive = latency_summary([x for latencies in probe_latencies.values() for x in latencies])
+        interactive["errors"] = probe_errors[0]
+        # Requêtes encore sans réponse à l'échéance (serveur saturé)
+        interactive["unanswered"] = probes_sent[0] - interactive["count"] - probe_errors[0]
+        interactive["by_path"] = {path: latency_summary(latencies) for path, latencies in probe_latencies.items()}
+        return {
+            "target": options["url"],
+            "duration_s": options["duration"],
+            "downloads": {
+                "concurrent_clients": options["downloads"],
+                "started": downloads["started"],
+                "completed": downloads["completed"],
+                "errors": downloads["errors"],
+                "max_in_flight": downloads["max_in_flight"],
+                "megabytes": round(downloads["bytes"] / 1e6, 2),
+                "ttfb": latency_summary(downloads["ttfb"]),
+            },
+            "interactive": interactive,
+        }
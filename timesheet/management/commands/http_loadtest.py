@@ -0,0 +1,225 @@
+import http.client
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from timesheet.loadtest import latency_summary, require_scratch_database, session_headers, start_local_server
+from timesheet.models import DailyEntry, Employee, WeeklyTimesheet
+from timesheet.purge import purge_timesheets
+
+LOADTEST_PREFIX = "__http_loadtest__"
+
+READ_ENDPOINTS = ("home", "employee_list", "timesheet_list", "payroll_summary", "timesheet_detail", "export")
+WRITE_ENDPOINTS = ("timesheet_create", "timesheet_detail_post")
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge HTTP: démarre l'application WSGI localement (ou cible --url), "
+        "simule des utilisateurs connectés avec un mélange lecture/écriture et "
+        "produit un rapport JSON (débit, p50/p95/p99, histogramme) par endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Serveur existant (ex. http://127.0.0.1:8000). Par défaut: serveur WSGI local.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Nombre d'utilisateurs simultanés (threads).")
+        parser.add_argument("--duration", type=float, default=20.0, help="Durée de la mesure (secondes).")
+        parser.add_argument("--write-ratio", type=float, default=0.1, help="Part des requêtes en écriture (0 à 1).")
+        parser.add_argument("--employees", type=int, default=20)
+        parser.add_argument("--weeks", type=int, default=8, help="Semaines de données par employé.")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--output", help="Fichier JSON du rapport (sinon sortie standard).")
+        parser.add_argument("--keep", action="store_true", help="Conserver les données générées.")
+
+    def handle(self, *args, **options):
+        require_scratch_database()
+        if not 0 <= options["write_ratio"] <= 1:
+            raise CommandError("--write-ratio doit être entre 0 et 1.")
+
+        rng = random.Random(options["seed"])
+        server = None
+        try:
+            fixtures = self._create_fixtures(options["employees"], options["weeks"])
+            if options["url"]:
+                base_url = options["url"].rstrip("/")
+            else:
+                server = start_local_server()
+                host, port = server.server_address[:2]
+                base_url = f"http://{host}:{port}"
+
+            report = self._run(base_url, fixtures, options, rng)
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+            if not options["keep"]:
+                self._delete_fixtures()
+
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['output']}"))
+        else:
+            self.stdout.write(payload)
+
+    # --- Données de test -------------------------------------------------
+
+    def _create_fixtures(self, n_employees, n_weeks):
+        user, _ = get_user_model().objects.get_or_create(username=LOADTEST_PREFIX)
+
+        this_monday = date.today() - timedelta(days=date.today().weekday())
+        timesheets = []
+        for i in range(n_employees):
+            employee = Employee.objects.create(name=f"{LOADTEST_PREFIX} {i:04d}", hourly_rate=25)
+            for w in range(n_weeks):
+                ts = WeeklyTimesheet.objects.create(employee=employee, week_start=this_monday - timedelta(weeks=w))
+                entry_ids = [
+                    DailyEntry.objects.create(timesheet=ts, day=day_code).pk
+                    for day_code, _ in DailyEntry.Weekday.choices
+                ]
+                timesheets.append((ts.pk, entry_ids))
+
+        return {
+            "user": user,
+            "employee_ids": list(Employee.objects.filter(name__startswith=LOADTEST_PREFIX).values_list("pk", flat=True)),
+            "timesheets": timesheets,
+        }
+
+    def _delete_fixtures(self):
+        employees = Employee.objects.filter(name__startswith=LOADTEST_PREFIX)
+        purge_timesheets(WeeklyTimesheet.objects.filter(employee__in=employees))
+        employees.delete()
+        get_user_model().objects.filter(username=LOADTEST_PREFIX).delete()
+
+    # --- Charge ------------------------------------------------------------
+
+    def _request_for(self, endpoint, fixtures, rng):
+        ts_id, entry_ids = rng.choice(fixtures["timesheets"])
+
+        if endpoint == "home":
+            return "GET", reverse("timesheet:home"), None
+        if endpoint == "employee_list":
+            return "GET", reverse("timesheet:employee_list"), None
+        if endpoint == "timesheet_list":
+            return "GET", reverse("timesheet:timesheet_list"), None
+        if endpoint == "payroll_summary":
+            return "GET", reverse("timesheet:payroll_summary"), None
+        if endpoint == "timesheet_detail":
+            return "GET", reverse("timesheet:timesheet_detail", args=[ts_id]), None
+        if endpoint == "export":
+            return "GET", reverse("timesheet:export_timesheet_excel", args=[ts_id]), None
+
+        if endpoint == "timesheet_create":
+            # Lundi aléatoire dans le passé: surtout des créations, parfois un doublon (200 + erreur)
+            monday = date.today() - timedelta(days=date.today().weekday()) - timedelta(weeks=rng.randint(52, 52 * 20))
+            data = {"employee": rng.choice(fixtures["employee_ids"]), "week_start": monday.isoformat()}
+            return "POST", reverse("timesheet:timesheet_create"), data
+
+        # timesheet_detail_post: semaine complète valide
+        start = rng.randint(6, 9)
+        times = [f"{start:02d}:00", "12:00", "12:45", "13:00", f"{start + 8:02d}:30"]
+        data = {
+            "form-TOTAL_FORMS": len(entry_ids),
+            "form-INITIAL_FORMS": len(entry_ids),
+            "form-MIN_NUM_FORMS": 0,
+            "form-MAX_NUM_FORMS": 1000,
+        }
+        for i, entry_id in enumerate(entry_ids):
+            data[f"form-{i}-id"] = entry_id
+            for field, value in zip(DailyEntry.TIME_FIELDS, times):
+                data[f"form-{i}-{field}"] = value if i < 5 else ""
+        return "POST", reverse("timesheet:timesheet_detail", args=[ts_id]), data
+
+    def _run(self, base_url, fixtures, options, rng):
+        parts = urlsplit(base_url)
+        deadline = time.perf_counter() + options["duration"]
+        results = {name: {"latencies": [], "errors": 0, "statuses": {}} for name in READ_ENDPOINTS + WRITE_ENDPOINTS}
+        lock = threading.Lock()
+
+        def user_loop(seed):
+            local_rng = random.Random(seed)
+            headers = session_headers(fixtures["user"])
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+            local = {name: {"latencies": [], "errors": 0, "statuses": {}} for name in results}
+
+            while time.perf_counter() < deadline:
+                if local_rng.random() < options["write_ratio"]:
+                    endpoint = local_rng.choice(WRITE_ENDPOINTS)
+                else:
+                    endpoint = local_rng.choice(READ_ENDPOINTS)
+                method, path, data = self._request_for(endpoint, fixtures, local_rng)
+
+                req_headers = dict(headers)
+                body = None
+                if data is not None:
+                    body = urlencode(data)
+                    req_headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+                stats = local[endpoint]
+                t0 = time.perf_counter()
+                try:
+                    conn.request(method, path, body=body, headers=req_headers)
+                    resp = conn.getresponse()
+                    resp.read()
+                    status = resp.status
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                    stats["errors"] += 1
+                    continue
+                stats["latencies"].append(time.perf_counter() - t0)
+                stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+                if status >= 400:
+                    stats["errors"] += 1
+                if resp.getheader("Connection", "").lower() == "close":
+                    conn.close()
+
+            conn.close()
+            with lock:
+                for name, stats in local.items():
+                    results[name]["latencies"].extend(stats["latencies"])
+                    results[name]["errors"] += stats["errors"]
+                    for status, count in stats["statuses"].items():
+                        results[name]["statuses"][status] = results[name]["statuses"].get(status, 0) + count
+
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=user_loop, args=(rng.random(),))
+            for _ in range(options["concurrency"])
+        ]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        elapsed = time.perf_counter() - started
+
+        endpoints = {}
+        all_latencies = []
+        for name, stats in results.items():
+            all_latencies.extend(stats["latencies"])
+            summary = latency_summary(stats["latencies"])
+            summary["errors"] = stats["errors"]
+            summary["statuses"] = {str(k): v for k, v in sorted(stats["statuses"].items())}
+            summary["throughput_rps"] = round(summary["count"] / elapsed, 2)
+            endpoints[name] = summary
+
+        overall = latency_summary(all_latencies)
+        overall["errors"] = sum(s["errors"] for s in results.values())
+        overall["throughput_rps"] = round(overall["count"] / elapsed, 2)
+
+        return {
+            "target": base_url,
+            "concurrency": options["concurrency"],
+            "duration_s": round(elapsed, 2),
+            "write_ratio": options["write_ratio"],
+            "overall": overall,
+            "endpoints": endpoints,
+        }
@@ -0,0 +1,176 @@
+import http.client
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from queue import Empty, Queue
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from timesheet.loadtest import latency_summary, require_scratch_database, start_local_server
+from timesheet.models import DailyEntry, Employee, WeeklyTimesheet
+from timesheet.punch import record_punch
+from timesheet.purge import purge_timesheets
+
+LOADTEST_PREFIX = "__punch_loadtest__"
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du pointage via /api/punch/ (serveur WSGI local ou --url): "
+        "chaque pointage est envoyé en même temps par --contention terminaux, puis renvoyé (réessai). "
+        "Le premier pointage de la journée crée donc la feuille et l'entrée en concurrence. "
+        "Vérifie qu'aucun pointage n'est perdu ni dupliqué, puis supprime les données."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=200)
+        parser.add_argument("--terminals", type=int, default=16, help="Terminaux simultanés (threads).")
+        parser.add_argument(
+            "--contention", type=int, default=4,
+            help="Terminaux qui envoient chaque pointage en même temps (1: un seul envoi par pointage).",
+        )
+        parser.add_argument("--url", help="Serveur existant (ex. http://127.0.0.1:8000). Par défaut: serveur WSGI local.")
+        parser.add_argument("--token", default="", help="Jeton X-Terminal-Token (par défaut: PUNCH_TERMINAL_TOKEN).")
+        parser.add_argument("--direct", action="store_true", help="Appeler record_punch() sans passer par HTTP.")
+        parser.add_argument("--keep", action="store_true", help="Conserver les données générées.")
+
+    def handle(self, *args, **options):
+        require_scratch_database()
+        if options["contention"] < 1:
+            raise CommandError("--contention doit être au moins 1.")
+        token = options["token"] or settings.PUNCH_TERMINAL_TOKEN
+        if options["url"] and not token:
+            raise CommandError("--token (ou PUNCH_TERMINAL_TOKEN) est requis avec --url.")
+        if not token:
+            # Serveur local, même processus: jeton jetable
+            token = get_random_string(32)
+
+        employees = [
+            Employee.objects.create(name=f"{LOADTEST_PREFIX} {i:05d}")
+            for i in range(options["employees"])
+        ]
+
+        # Pointages à la minute près, aujourd'hui: 08:00, 12:00, 13:00, 17:00, 21:00
+        today = timezone.localdate()
+        base = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        punch_times = [base + timedelta(hours=h) for h in (8, 12, 13, 17, 21)]
+
+        # Une vague par heure de pointage, dans l'ordre chronologique. Dans une vague, les copies
+        # d'un même pointage sont consécutives: des terminaux différents les prennent en même temps.
+        waves = [
+            [(emp.pk, at) for emp in employees for _ in range(options["contention"])]
+            for at in punch_times
+        ]
+
+        server = None
+        try:
+            with override_settings(PUNCH_TERMINAL_TOKEN=token):
+                if options["direct"]:
+                    send = None
+                else:
+                    if options["url"]:
+                        base_url = options["url"].rstrip("/")
+                    else:
+                        server = start_local_server()
+                        host, port = server.server_address[:2]
+                        base_url = f"http://{host}:{port}"
+                    send = (base_url, token)
+                latencies, statuses, errors, elapsed = self._run(waves, options["terminals"], send)
+            self._report(employees, punch_times, latencies, statuses, errors, elapsed)
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+            if not options["keep"]:
+                generated = Employee.objects.filter(name__startswith=LOADTEST_PREFIX)
+                purge_timesheets(WeeklyTimesheet.objects.filter(employee__in=generated))
+                generated.delete()
+
+    def _run(self, waves, n_terminals, send):
+        latencies = []
+        statuses = Counter()
+        errors = []
+        lock = threading.Lock()
+        path = reverse("timesheet:punch")
+
+        def terminal(queue):
+            local, local_statuses = [], Counter()
+            conn = None
+            if send:
+                parts = urlsplit(send[0])
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                headers = {"X-Terminal-Token": send[1], "Content-Type": "application/x-www-form-urlencoded"}
+            try:
+                while True:
+                    try:
+                        employee_id, at = queue.get_nowait()
+                    except Empty:
+                        break
+                    for _ in range(2):  # le second envoi simule un réessai du terminal
+                        t0 = time.perf_counter()
+                        if send:
+                            body = urlencode({"employee": employee_id, "at": at.isoformat()})
+                            conn.request("POST", path, body=body, headers=headers)
+                            resp = conn.getresponse()
+                            resp.read()
+                            status = resp.status
+                        else:
+                            status = 200 if record_punch(employee_id, at).slot else 409
+                        local.append(time.perf_counter() - t0)
+                        local_statuses[status] += 1
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                with lock:
+                    latencies.extend(local)
+                    statuses.update(local_statuses)
+                if conn:
+                    conn.close()
+                connection.close()
+
+        started = time.perf_counter()
+        for wave in waves:
+            queue = Queue()
+            for item in wave:
+                queue.put(item)
+            threads = [threading.Thread(target=terminal, args=(queue,)) for _ in range(n_terminals)]
+            for th in threads:
+                th.start()
+            for th in threads:
+                th.join()
+        return latencies, statuses, errors, time.perf_counter() - started
+
+    def _report(self, employees, punch_times, latencies, statuses, errors, elapsed):
+        expected = [timezone.localtime(at).time() for at in punch_times]
+        bad = 0
+        for ts in WeeklyTimesheet.objects.filter(employee__in=employees).prefetch_related("entries"):
+            entries = list(ts.entries.all())
+            if len(entries) != 1 or [getattr(entries[0], s) for s in DailyEntry.TIME_FIELDS] != expected:
+                bad += 1
+        missing = len(employees) - WeeklyTimesheet.objects.filter(employee__in=employees).count()
+
+        summary = latency_summary(latencies)
+        n = summary["count"]
+        self.stdout.write(f"Pointages: {n} en {elapsed:.2f} s -> {n / elapsed:.0f} pointages/s")
+        self.stdout.write(f"Latence ms: p50={summary['p50_ms']} p95={summary['p95_ms']} p99={summary['p99_ms']}")
+        self.stdout.write(f"Statuts HTTP: {dict(sorted(statuses.items()))}")
+
+        failed = sum(count for status, count in statuses.items() if status != 200)
+        if errors or bad or missing or failed:
+            self.stderr.write(self.style.ERROR(
+                f"Échec: {len(errors)} erreur(s), {failed} réponse(s) non 200, "
+                f"{bad} journée(s) incorrecte(s), {missing} feuille(s) manquante(s)."
+            ))
+            for exc in errors[:5]:
+                self.stderr.write(repr(exc))
+        else:
+            self.stdout.write(self.style.SUCCESS("OK: aucun pointage perdu ni dupliqué."))
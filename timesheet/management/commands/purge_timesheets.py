@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from timesheet.models import WeeklyTimesheet
+from timesheet.purge import DEFAULT_BATCH_SIZE, purge_timesheets
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge de rétention: supprime par lots les feuilles de temps (et leurs entrées) "
+        "dont la semaine commence avant l'horizon donné."
+    )
+
+    def add_arguments(self, parser):
+        horizon = parser.add_mutually_exclusive_group(required=True)
+        horizon.add_argument("--before", type=date.fromisoformat, help="Date limite (AAAA-MM-JJ), exclue.")
+        horizon.add_argument("--older-than-days", type=int, help="Conserver seulement les N derniers jours.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=0.05, help="Pause entre deux lots (secondes).")
+        parser.add_argument("--dry-run", action="store_true", help="Compter sans supprimer.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size doit être positif.")
+        if options["older_than_days"] is not None and options["older_than_days"] < 1:
+            raise CommandError("--older-than-days doit être positif.")
+        if options["pause"] < 0:
+            raise CommandError("--pause ne peut pas être négative.")
+
+        cutoff = options["before"] or date.today() - timedelta(days=options["older_than_days"])
+        timesheets = WeeklyTimesheet.objects.filter(week_start__lt=cutoff)
+        total = timesheets.count()
+
+        if options["dry_run"]:
+            self.stdout.write(f"{total} feuille(s) antérieure(s) au {cutoff} seraient supprimées.")
+            return
+
+        def progress(timesheets_done, entries_done):
+            self.stdout.write(f"{timesheets_done}/{total} feuilles, {entries_done} entrées supprimées")
+
+        deleted_timesheets, deleted_entries = purge_timesheets(
+            timesheets,
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Purge terminée: {deleted_timesheets} feuille(s) et {deleted_entries} entrée(s) antérieures au {cutoff}."
+        ))
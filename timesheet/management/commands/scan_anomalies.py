@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from timesheet.anomalies import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_EXAMPLES_PER_KIND,
+    DEFAULT_LONG_DAY_HOURS,
+    save_scan,
+    scan,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyse toutes les feuilles de temps en SQL, par tranches de clé primaire: "
+        "blocs incomplets, heures dans le désordre, journées trop longues, "
+        "semaines vides et semaines ne commençant pas un lundi. "
+        "Le résumé est enregistré pour la page des anomalies (à planifier, ex. chaque nuit)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--long-day-hours", type=int, default=DEFAULT_LONG_DAY_HOURS)
+        parser.add_argument("--examples", type=int, default=DEFAULT_EXAMPLES_PER_KIND, help="Exemples conservés par type.")
+        parser.add_argument("--details", action="store_true", help="Afficher chaque anomalie.")
+        parser.add_argument("--dry-run", action="store_true", help="Ne pas enregistrer le résumé.")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size doit être au moins 1.")
+        started_at = timezone.now()
+        anomalies = scan(chunk_size=options["chunk_size"], long_day_hours=options["long_day_hours"])
+
+        if options["details"]:
+            anomalies = self._print_details(anomalies)
+
+        report = summarize(anomalies, examples_per_kind=options["examples"])
+        total = 0
+        for row in report:
+            total += row["count"]
+            self.stdout.write(f"{row['label']}: {row['count']}")
+
+        style = self.style.WARNING if total else self.style.SUCCESS
+        self.stdout.write(style(f"Total: {total} anomalie(s)."))
+
+        if not options["dry_run"]:
+            save_scan(report, started_at, options["long_day_hours"])
+
+    def _print_details(self, anomalies):
+        for a in anomalies:
+            self.stdout.write(
+                f"[{a.kind}] feuille #{a.timesheet_id} {a.employee} {a.week_start}"
+                + (f" {a.day} (entrée #{a.entry_id})" if a.entry_id else "")
+            )
+            yield a
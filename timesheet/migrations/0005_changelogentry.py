@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:46
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0004_employee_hourly_rate_employee_weekly_regular_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50, verbose_name='Modèle')),
+                ('object_pk', models.BigIntegerField(verbose_name='Id de l’objet')),
+                ('action', models.CharField(choices=[('INSERT', 'Création'), ('UPDATE', 'Modification'), ('DELETE', 'Suppression')], max_length=6, verbose_name='Action')),
+                ('data', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Données')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+            ],
+            options={
+                'verbose_name': 'Changement',
+                'verbose_name_plural': 'Journal des changements',
+                'ordering': ['id'],
+            },
+        ),
+    ]
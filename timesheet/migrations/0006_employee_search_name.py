@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:47
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_search(text):
+    # Copie figée de timesheet.models.normalize_search: une migration ne dépend pas du code courant
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def fill_search_name(apps, schema_editor):
+    Employee = apps.get_model("timesheet", "Employee")
+    employees = list(Employee.objects.only("pk", "name"))
+    for emp in employees:
+        emp.search_name = normalize_search(emp.name)
+    Employee.objects.bulk_update(employees, ["search_name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0005_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+    ]
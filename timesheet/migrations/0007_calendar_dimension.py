@@ -0,0 +1,144 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:05
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+WEEKDAYS = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+
+# Plage initiale du calendrier; build_calendar la prolonge ou la recalcule ensuite.
+CALENDAR_START = date(2020, 1, 1)
+CALENDAR_END = date(2040, 12, 31)
+
+
+def fill_day_order(apps, schema_editor):
+    DailyEntry = apps.get_model("timesheet", "DailyEntry")
+    DailyEntry.objects.update(day_order=Case(
+        *(When(day=code, then=Value(i)) for i, code in enumerate(WEEKDAYS, start=1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+
+
+def fill_calendar(apps, schema_editor):
+    # Copie figée de timesheet.periods.calendar_rows: une migration ne dépend pas du code courant
+    CalendarWeek = apps.get_model("timesheet", "CalendarWeek")
+    CalendarDay = apps.get_model("timesheet", "CalendarDay")
+    anchor = getattr(settings, "PAY_PERIOD_ANCHOR", date(2024, 1, 1))
+    length = 7 * getattr(settings, "PAY_PERIOD_WEEKS", 2)
+
+    weeks, days = [], []
+    monday = CALENDAR_START - timedelta(days=CALENDAR_START.weekday())
+    while monday <= CALENDAR_END:
+        iso = monday.isocalendar()
+        pay_period_start = anchor + timedelta(days=(monday - anchor).days // length * length)
+        weeks.append(CalendarWeek(
+            week_start=monday,
+            iso_year=iso.year,
+            iso_week=iso.week,
+            year=monday.year,
+            month=monday.month,
+            quarter=(monday.month - 1) // 3 + 1,
+            pay_period_start=pay_period_start,
+        ))
+        for offset in range(7):
+            d = monday + timedelta(days=offset)
+            days.append(CalendarDay(
+                date=d,
+                week_start=monday,
+                weekday=offset + 1,
+                iso_year=iso.year,
+                iso_week=iso.week,
+                year=d.year,
+                month=d.month,
+                quarter=(d.month - 1) // 3 + 1,
+                pay_period_start=pay_period_start,
+            ))
+        monday += timedelta(weeks=1)
+
+    CalendarWeek.objects.bulk_create(weeks, batch_size=1000)
+    CalendarDay.objects.bulk_create(days, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0006_employee_search_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarDay',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False, verbose_name='Date')),
+                ('week_start', models.DateField(verbose_name='Début de la semaine (lundi)')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='Jour de la semaine (1 = lundi)')),
+                ('iso_year', models.PositiveSmallIntegerField(verbose_name='Année ISO')),
+                ('iso_week', models.PositiveSmallIntegerField(verbose_name='Semaine ISO')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Année')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Mois')),
+                ('quarter', models.PositiveSmallIntegerField(verbose_name='Trimestre')),
+                ('pay_period_start', models.DateField(verbose_name='Début de la période de paie')),
+            ],
+            options={
+                'verbose_name': 'Jour du calendrier',
+                'verbose_name_plural': 'Jours du calendrier',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarWeek',
+            fields=[
+                ('week_start', models.DateField(primary_key=True, serialize=False, verbose_name='Début de la semaine (lundi)')),
+                ('iso_year', models.PositiveSmallIntegerField(verbose_name='Année ISO')),
+                ('iso_week', models.PositiveSmallIntegerField(verbose_name='Semaine ISO')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Année')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Mois')),
+                ('quarter', models.PositiveSmallIntegerField(verbose_name='Trimestre')),
+                ('pay_period_start', models.DateField(db_index=True, verbose_name='Début de la période de paie')),
+            ],
+            options={
+                'verbose_name': 'Semaine du calendrier',
+                'verbose_name_plural': 'Semaines du calendrier',
+                'ordering': ['week_start'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='dailyentry',
+            options={'ordering': ['timesheet_id', 'day_order'], 'verbose_name': 'Entrée journalière', 'verbose_name_plural': 'Entrées journalières'},
+        ),
+        migrations.AddField(
+            model_name='dailyentry',
+            name='day_order',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Ordre du jour'),
+        ),
+        migrations.AlterField(
+            model_name='weeklytimesheet',
+            name='week_start',
+            field=models.DateField(db_index=True, verbose_name='Début de la semaine (lundi)'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyentry',
+            index=models.Index(fields=['timesheet', 'day_order'], name='timesheet_d_timeshe_c3c1bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarday',
+            index=models.Index(fields=['year', 'month'], name='timesheet_c_year_8dd175_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='calendarday',
+            unique_together={('week_start', 'weekday')},
+        ),
+        migrations.AddIndex(
+            model_name='calendarweek',
+            index=models.Index(fields=['iso_year', 'iso_week'], name='timesheet_c_iso_yea_1f0d2b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarweek',
+            index=models.Index(fields=['year', 'month'], name='timesheet_c_year_2472f3_idx'),
+        ),
+        migrations.RunPython(fill_day_order, migrations.RunPython.noop),
+        migrations.RunPython(fill_calendar, migrations.RunPython.noop),
+    ]
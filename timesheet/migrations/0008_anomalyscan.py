@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:15
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0007_calendar_dimension'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnomalyScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Début de l’analyse')),
+                ('finished_at', models.DateTimeField(auto_now_add=True, verbose_name='Fin de l’analyse')),
+                ('long_day_hours', models.PositiveSmallIntegerField(verbose_name='Seuil de journée longue (h)')),
+                ('total', models.PositiveIntegerField(verbose_name='Nombre d’anomalies')),
+                ('report', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Rapport')),
+            ],
+            options={
+                'verbose_name': 'Analyse d’anomalies',
+                'verbose_name_plural': 'Analyses d’anomalies',
+                'ordering': ['-finished_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:18
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, DateField, Value, When
+
+
+def fill_work_date(apps, schema_editor):
+    # Un UPDATE par semaine: la date ne dépend que de week_start et de day_order
+    WeeklyTimesheet = apps.get_model("timesheet", "WeeklyTimesheet")
+    DailyEntry = apps.get_model("timesheet", "DailyEntry")
+    weeks = WeeklyTimesheet.objects.order_by().values_list("week_start", flat=True).distinct()
+    for week_start in list(weeks):
+        DailyEntry.objects.filter(timesheet__week_start=week_start).update(work_date=Case(
+            *(When(day_order=i, then=Value(week_start + timedelta(days=i - 1))) for i in range(1, 8)),
+            output_field=DateField(),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet', '0008_anomalyscan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyentry',
+            name='work_date',
+            field=models.ForeignKey(db_column='work_date', db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='timesheet.calendarday', verbose_name='Date'),
+        ),
+        migrations.RunPython(fill_work_date, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,95 @@
 from __future__ import annotations
 
+import unicodedata
 from datetime import datetime, date, time, timedelta
 from decimal import Decimal
 
+from django.core import serializers
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Journal append-only des changements (flux incrémental pour la paie externe).
+    L'id auto-incrémenté sert de curseur monotone: un client ne relit que `id > curseur`.
+    """
+    class Action(models.TextChoices):
+        INSERT = "INSERT", "Création"
+        UPDATE = "UPDATE", "Modification"
+        DELETE = "DELETE", "Suppression"
+
+    model = models.CharField("Modèle", max_length=50)
+    object_pk = models.BigIntegerField("Id de l’objet")
+    action = models.CharField("Action", max_length=6, choices=Action.choices)
+    data = models.JSONField("Données", encoder=DjangoJSONEncoder, null=True, blank=True)
+    created_at = models.DateTimeField("Créé le", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Changement"
+        verbose_name_plural = "Journal des changements"
+        ordering = ["id"]
 
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.action} {self.model}:{self.object_pk}"
+
+    @classmethod
+    def record(cls, instance: models.Model, action: str) -> "ChangeLogEntry":
+        data = None
+        if action != cls.Action.DELETE:
+            fields = serializers.serialize("python", [instance])[0]["fields"]
+            derived = getattr(instance, "DERIVED_FIELDS", ())
+            data = {name: value for name, value in fields.items() if name not in derived}
+        return cls.objects.create(
+            model=instance._meta.model_name,
+            object_pk=instance.pk,
+            action=action,
+            data=data,
+        )
+
+
+class ChangeTrackedModel(models.Model):
+    """
+    Écrit l'entrée du journal dans la même transaction que la sauvegarde.
+    Les suppressions (y compris en cascade) sont journalisées par signals.py.
+    """
+    # Colonnes recalculées à partir des autres à chaque sauvegarde: hors du journal,
+    # pour que leurs mises à jour en masse (QuerySet.update) n'aient pas à y figurer
+    DERIVED_FIELDS: tuple[str, ...] = ()
 
-class Employee(models.Model):
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            ChangeLogEntry.record(
+                self,
+                ChangeLogEntry.Action.INSERT if adding else ChangeLogEntry.Action.UPDATE,
+            )
+
+
+def normalize_search(text: str) -> str:
+    """Minuscules, sans accents, espaces compactés: « Éloïse  Côté » -> « eloise cote »."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+class Employee(ChangeTrackedModel):
     name = models.CharField("Nom de l’employé", max_length=150)
+    # Nom normalisé et indexé pour la recherche par préfixe (autocomplétion)
+    search_name = models.CharField(max_length=150, db_index=True, editable=False, default="")
     is_active = models.BooleanField("Actif", default=True)
     hourly_rate = models.DecimalField("Taux horaire", max_digits=8, decimal_places=2, default=Decimal("0.00"))
     weekly_regular_hours = models.DecimalField("Heures normales/semaine", max_digits=5, decimal_places=2, default=Decimal("40.00"))
     created_at = models.DateTimeField("Créé le", auto_now_add=True)
 
+    DERIVED_FIELDS = ("search_name",)
+
     class Meta:
         verbose_name = "Employé"
         verbose_name_plural = "Employés"
@@ -22,14 +98,33 @@ class Employee(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_search(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def search(cls, query: str):
+        """
+        Recherche par préfixe insensible aux accents et à la casse.
+        Bornes >= / < plutôt que LIKE pour que l'index sur search_name serve sur tout backend.
+        """
+        prefix = normalize_search(query)
+        qs = cls.objects.order_by("search_name", "pk")
+        if prefix:
+            qs = qs.filter(search_name__gte=prefix, search_name__lt=prefix + "\U0010ffff")
+        return qs
+
 
-class WeeklyTimesheet(models.Model):
+class WeeklyTimesheet(ChangeTrackedModel):
     employee = models.ForeignKey(
         Employee,
         on_delete=models.CASCADE,
         related_name="timesheets",
     )
-    week_start = models.DateField("Début de la semaine (lundi)")
+    week_start = models.DateField("Début de la semaine (lundi)", db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -49,10 +144,26 @@ class WeeklyTimesheet(models.Model):
                 "week_start": "La date doit être un lundi (début de la semaine)."
             })
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # week_start tel que lu en base (absent si différé): save() ne recalcule les dates des entrées que s'il change
+        instance._saved_week_start = instance.__dict__.get("week_start")
+        return instance
+
     # ✅ Force validation même via admin
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        week_changed = not self._state.adding and self.week_start != getattr(self, "_saved_week_start", None)
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if week_changed:
+                # Dates des entrées dérivées de week_start (colonne hors journal, le changement est journalisé sur la feuille)
+                self.entries.update(work_date=Case(
+                    *(When(day_order=d.day_order, then=Value(d.date_in(self.week_start))) for d in DailyEntry.Weekday),
+                    output_field=models.DateField(),
+                ))
+        self._saved_week_start = self.week_start
 
     # ✅ Calcul fiable basé sur minutes (pas de float)
     @property
@@ -83,7 +194,7 @@ class WeeklyTimesheet(models.Model):
         return self.week_start + timedelta(days=6)
 
 
-class DailyEntry(models.Model):
+class DailyEntry(ChangeTrackedModel):
     class Weekday(models.TextChoices):
         MONDAY = "MON", "Lundi"
         TUESDAY = "TUE", "Mardi"
@@ -93,12 +204,38 @@ class DailyEntry(models.Model):
         SATURDAY = "SAT", "Samedi"
         SUNDAY = "SUN", "Dimanche"
 
+        @classmethod
+        def for_date(cls, d: date) -> "DailyEntry.Weekday":
+            return list(cls)[d.weekday()]
+
+        @property
+        def day_order(self) -> int:
+            """1 = lundi ... 7 = dimanche (colonne DailyEntry.day_order)."""
+            return list(type(self)).index(self) + 1
+
+        def date_in(self, week_start: date) -> date:
+            return week_start + timedelta(days=self.day_order - 1)
+
     timesheet = models.ForeignKey(
         WeeklyTimesheet,
         on_delete=models.CASCADE,
         related_name="entries",
     )
     day = models.CharField("Jour", max_length=3, choices=Weekday.choices)
+    # 1 = lundi ... 7 = dimanche, dérivé de `day` à la sauvegarde (tri)
+    day_order = models.PositiveSmallIntegerField("Ordre du jour", editable=False, default=0)
+    # Date du jour (semaine de la feuille + day_order), clé indexée de la jointure au calendrier.
+    # Sans contrainte: le calendrier peut être prolongé après coup (periods.ensure_calendar).
+    work_date = models.ForeignKey(
+        "CalendarDay",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_column="work_date",
+        null=True,
+        editable=False,
+        related_name="+",
+        verbose_name="Date",
+    )
 
     arrival_morning = models.TimeField("Heure d’arrivée (matin)", null=True, blank=True)
     lunch_departure = models.TimeField("Départ dîner", null=True, blank=True)
@@ -107,15 +244,36 @@ class DailyEntry(models.Model):
     arrival_evening = models.TimeField("Heure d’arrivée (soir)", null=True, blank=True)
     departure_evening = models.TimeField("Heure de départ (soir)", null=True, blank=True)
 
+    DERIVED_FIELDS = ("day_order", "work_date")
+
+    # Pointages dans l'ordre de la journée: arrivée, départ dîner, retour dîner, arrivée soir, départ soir
+    TIME_FIELDS = (
+        "arrival_morning",
+        "lunch_departure",
+        "lunch_return",
+        "arrival_evening",
+        "departure_evening",
+    )
+
     class Meta:
         verbose_name = "Entrée journalière"
         verbose_name_plural = "Entrées journalières"
         unique_together = ("timesheet", "day")
-        ordering = ["timesheet_id", "day"]
+        ordering = ["timesheet_id", "day_order"]
+        indexes = [models.Index(fields=["timesheet", "day_order"])]
 
     def __str__(self) -> str:
         return f"{self.timesheet} - {self.get_day_display()}"
 
+    def save(self, *args, **kwargs):
+        weekday = self.Weekday(self.day)
+        self.day_order = weekday.day_order
+        self.work_date_id = weekday.date_in(self.timesheet.week_start)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "day" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "day_order", "work_date"}
+        super().save(*args, **kwargs)
+
     def clean(self):
         """
         Validation simple:
@@ -169,4 +327,70 @@ class DailyEntry(models.Model):
     
     @property
     def total_hours(self) -> float:
-        return round(self.total_minutes / 60, 2)
\ No newline at end of file
+        return round(self.total_minutes / 60, 2)
+
+
+class AnomalyScan(models.Model):
+    """
+    Résultat d'une exécution de scan_anomalies: comptes et premiers exemples par type.
+    La page des anomalies lit le dernier résultat au lieu d'analyser les tables à chaque requête.
+    """
+    started_at = models.DateTimeField("Début de l’analyse")
+    finished_at = models.DateTimeField("Fin de l’analyse", auto_now_add=True)
+    long_day_hours = models.PositiveSmallIntegerField("Seuil de journée longue (h)")
+    total = models.PositiveIntegerField("Nombre d’anomalies")
+    report = models.JSONField("Rapport", encoder=DjangoJSONEncoder)
+
+    class Meta:
+        verbose_name = "Analyse d’anomalies"
+        verbose_name_plural = "Analyses d’anomalies"
+        ordering = ["-finished_at"]
+
+    def __str__(self) -> str:
+        return f"{self.finished_at:%Y-%m-%d %H:%M} ({self.total})"
+
+
+class CalendarWeek(models.Model):
+    """Dimension semaine: une ligne par lundi, rattachée à l'année/semaine ISO, au mois, au trimestre et à la période de paie."""
+    week_start = models.DateField("Début de la semaine (lundi)", primary_key=True)
+    iso_year = models.PositiveSmallIntegerField("Année ISO")
+    iso_week = models.PositiveSmallIntegerField("Semaine ISO")
+    year = models.PositiveSmallIntegerField("Année")
+    month = models.PositiveSmallIntegerField("Mois")
+    quarter = models.PositiveSmallIntegerField("Trimestre")
+    pay_period_start = models.DateField("Début de la période de paie", db_index=True)
+
+    class Meta:
+        verbose_name = "Semaine du calendrier"
+        verbose_name_plural = "Semaines du calendrier"
+        ordering = ["week_start"]
+        indexes = [
+            models.Index(fields=["iso_year", "iso_week"]),
+            models.Index(fields=["year", "month"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.iso_year}-S{self.iso_week:02d}"
+
+
+class CalendarDay(models.Model):
+    """Dimension jour, jointe par DailyEntry.work_date; (week_start, weekday) correspond à (WeeklyTimesheet.week_start, DailyEntry.day_order)."""
+    date = models.DateField("Date", primary_key=True)
+    week_start = models.DateField("Début de la semaine (lundi)")
+    weekday = models.PositiveSmallIntegerField("Jour de la semaine (1 = lundi)")
+    iso_year = models.PositiveSmallIntegerField("Année ISO")
+    iso_week = models.PositiveSmallIntegerField("Semaine ISO")
+    year = models.PositiveSmallIntegerField("Année")
+    month = models.PositiveSmallIntegerField("Mois")
+    quarter = models.PositiveSmallIntegerField("Trimestre")
+    pay_period_start = models.DateField("Début de la période de paie")
+
+    class Meta:
+        verbose_name = "Jour du calendrier"
+        verbose_name_plural = "Jours du calendrier"
+        ordering = ["date"]
+        unique_together = ("week_start", "weekday")
+        indexes = [models.Index(fields=["year", "month"])]
+
+    def __str__(self) -> str:
+        return self.date.isoformat()
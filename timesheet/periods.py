@@ -0,0 +1,164 @@
+"""
+Dimension calendrier (semaines, jours) et rapports d'heures par période.
+
+Chaque DailyEntry porte sa date (work_date, clé du CalendarDay): les cumuls par mois,
+trimestre, semaine ISO ou période de paie sont une jointure sur clé primaire suivie
+d'un GROUP BY, sans boucle de dates en Python.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, DurationField, ExpressionWrapper, F, Sum, Value, When
+
+from .models import CalendarDay, CalendarWeek, DailyEntry
+
+DEFAULT_CALENDAR_START = date(2020, 1, 1)
+DEFAULT_CALENDAR_END = date(2040, 12, 31)
+
+# Attributs recalculés par build_calendar (communs aux semaines et aux jours)
+CALENDAR_COLUMNS = ["iso_year", "iso_week", "year", "month", "quarter", "pay_period_start"]
+
+# Colonnes de regroupement par type de période
+PERIODS = {
+    "month": ("year", "month"),
+    "quarter": ("year", "quarter"),
+    "iso_week": ("iso_year", "iso_week"),
+    "pay_period": ("pay_period_start",),
+}
+
+PERIOD_LABELS = {
+    "month": "Mois",
+    "quarter": "Trimestre",
+    "iso_week": "Semaine ISO",
+    "pay_period": "Période de paie",
+}
+
+
+def pay_period_start(day: date) -> date:
+    """Début de la période de paie (PAY_PERIOD_WEEKS semaines à partir de PAY_PERIOD_ANCHOR, un lundi)."""
+    anchor = getattr(settings, "PAY_PERIOD_ANCHOR", date(2024, 1, 1))
+    length = 7 * getattr(settings, "PAY_PERIOD_WEEKS", 2)
+    return anchor + timedelta(days=(day - anchor).days // length * length)
+
+
+def calendar_rows(start: date, end: date) -> tuple[list[dict], list[dict]]:
+    """Lignes (semaines, jours) couvrant start..end, étendues aux semaines complètes."""
+    monday = start - timedelta(days=start.weekday())
+    weeks, days = [], []
+    while monday <= end:
+        iso = monday.isocalendar()
+        weeks.append({
+            "week_start": monday,
+            "iso_year": iso.year,
+            "iso_week": iso.week,
+            "year": monday.year,
+            "month": monday.month,
+            "quarter": (monday.month - 1) // 3 + 1,
+            "pay_period_start": pay_period_start(monday),
+        })
+        for offset in range(7):
+            d = monday + timedelta(days=offset)
+            days.append({
+                "date": d,
+                "week_start": monday,
+                "weekday": offset + 1,
+                "iso_year": iso.year,
+                "iso_week": iso.week,
+                "year": d.year,
+                "month": d.month,
+                "quarter": (d.month - 1) // 3 + 1,
+                "pay_period_start": pay_period_start(monday),
+            })
+        monday += timedelta(weeks=1)
+    return weeks, days
+
+
+def build_calendar(start: date, end: date) -> tuple[int, int]:
+    """
+    Insère les semaines et jours manquants et recalcule les lignes existantes (idempotent).
+    Après un changement de PAY_PERIOD_ANCHOR ou PAY_PERIOD_WEEKS, relancer sur toute la plage.
+    """
+    weeks, days = calendar_rows(start, end)
+    CalendarWeek.objects.bulk_create(
+        [CalendarWeek(**row) for row in weeks],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["week_start"],
+        update_fields=CALENDAR_COLUMNS,
+    )
+    CalendarDay.objects.bulk_create(
+        [CalendarDay(**row) for row in days],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["date"],
+        update_fields=["week_start", "weekday", *CALENDAR_COLUMNS],
+    )
+    return len(weeks), len(days)
+
+
+def ensure_calendar(start: date, end: date) -> bool:
+    """Prolonge le calendrier si des jours de start..end manquent (hors de la plage initiale). True si prolongé."""
+    if CalendarDay.objects.filter(date__gte=start, date__lte=end).count() == (end - start).days + 1:
+        return False
+    build_calendar(start, end)
+    return True
+
+
+def block_duration(start: str, end: str):
+    """Comme DailyEntry._duration: 0 si une heure manque ou si le bloc est inversé (v1: pas de quart de nuit)."""
+    return Case(
+        When(**{f"{end}__gte": F(start)}, then=ExpressionWrapper(F(end) - F(start), output_field=DurationField())),
+        default=Value(timedelta(0)),
+        output_field=DurationField(),
+    )
+
+
+def worked_duration():
+    """Durée travaillée d'une entrée en SQL (matin + soir), comme DailyEntry.total_duration."""
+    return block_duration("arrival_morning", "lunch_departure") + block_duration("arrival_evening", "departure_evening")
+
+
+def period_label(period: str, row: dict) -> str:
+    if period == "month":
+        return f"{row['year']}-{row['month']:02d}"
+    if period == "quarter":
+        return f"{row['year']}-T{row['quarter']}"
+    if period == "iso_week":
+        return f"{row['iso_year']}-S{row['iso_week']:02d}"
+    return row["pay_period_start"].isoformat()
+
+
+def hours_by_period(period: str, start: date, end: date, employee_ids=None) -> list[dict]:
+    """
+    Heures par employé et par période pour les jours travaillés entre start et end (inclus).
+    Bornes sur l'index de work_date, jointure CalendarDay sur sa clé primaire, GROUP BY.
+    Le calendrier est d'abord prolongé si la plage le dépasse: aucune entrée n'est écartée par la jointure.
+    """
+    columns = PERIODS[period]
+    ensure_calendar(start, end)
+    entries = DailyEntry.objects.filter(work_date__gte=start, work_date__lte=end)
+    if employee_ids is not None:
+        entries = entries.filter(timesheet__employee_id__in=employee_ids)
+
+    rows = (
+        entries
+        .values("timesheet__employee_id", "timesheet__employee__name", *(f"work_date__{c}" for c in columns))
+        .annotate(worked=Sum(worked_duration()))
+        .order_by("timesheet__employee__name", *(f"work_date__{c}" for c in columns))
+    )
+
+    report = []
+    for row in rows:
+        key = {c: row[f"work_date__{c}"] for c in columns}
+        minutes = int((row["worked"] or timedelta(0)).total_seconds() // 60)
+        report.append({
+            "employee_id": row["timesheet__employee_id"],
+            "employee_name": row["timesheet__employee__name"],
+            "period": period_label(period, key),
+            "minutes": minutes,
+            "hours": (Decimal(minutes) / Decimal(60)).quantize(Decimal("0.01")),
+        })
+    return report
@@ -0,0 +1,113 @@
+"""
+Pointage des terminaux (badge): chaque pointage remplit le prochain créneau vide
+de l'entrée du jour, par un UPDATE conditionnel unique (pas de lecture-modification-écriture).
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from functools import cache
+from typing import NamedTuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ChangeLogEntry, DailyEntry, Employee, WeeklyTimesheet
+
+# SQLite n'admet qu'un écrivain: entre les threads d'un même processus, attendre sur un verrou
+# Python (réveil immédiat) plutôt que dans le gestionnaire d'occupation de SQLite (sommeil par paliers).
+_sqlite_write_lock = threading.Lock()
+
+
+class PunchResult(NamedTuple):
+    entry: DailyEntry
+    slot: str | None  # None: journée complète, pointage refusé
+    replayed: bool  # True: pointage déjà enregistré (réessai du terminal)
+
+
+def _write_lock():
+    return _sqlite_write_lock if connection.vendor == "sqlite" else nullcontext()
+
+
+@cache
+def _punch_sql() -> str:
+    """
+    UPDATE unique, construit une fois: le créneau k reçoit l'heure s'il est vide et que
+    tous les créneaux précédents sont remplis. Le WHERE écarte la journée complète et
+    l'heure déjà enregistrée (réessai), ce qui rend l'écriture idempotente.
+    RETURNING (SQLite >= 3.35, PostgreSQL) renvoie la ligne écrite: pas de relecture.
+    """
+    qn = connection.ops.quote_name
+    sets = []
+    for i, slot in enumerate(DailyEntry.TIME_FIELDS):
+        conditions = [f"{qn(slot)} IS NULL"] + [f"{qn(prev)} IS NOT NULL" for prev in DailyEntry.TIME_FIELDS[:i]]
+        sets.append(f"{qn(slot)} = CASE WHEN {' AND '.join(conditions)} THEN %s ELSE {qn(slot)} END")
+    not_punched = " AND ".join(f"({qn(slot)} IS NULL OR {qn(slot)} <> %s)" for slot in DailyEntry.TIME_FIELDS)
+    columns = ", ".join(qn(f.column) for f in DailyEntry._meta.concrete_fields)
+    return (
+        f"UPDATE {qn(DailyEntry._meta.db_table)} SET {', '.join(sets)} "
+        f"WHERE {qn(DailyEntry._meta.pk.column)} = %s AND {qn(DailyEntry.TIME_FIELDS[-1])} IS NULL AND {not_punched} "
+        f"RETURNING {columns}"
+    )
+
+
+@cache
+def _entry_sql() -> str:
+    """Entrée du jour d'un employé actif, en une jointure indexée; SQL construit une fois (pas de compilation ORM par pointage)."""
+    qn = connection.ops.quote_name
+    entry, timesheet, employee = (qn(m._meta.db_table) for m in (DailyEntry, WeeklyTimesheet, Employee))
+    return (
+        f"SELECT {entry}.{qn('id')} FROM {entry} "
+        f"INNER JOIN {timesheet} ON {timesheet}.{qn('id')} = {entry}.{qn('timesheet_id')} "
+        f"INNER JOIN {employee} ON {employee}.{qn('id')} = {timesheet}.{qn('employee_id')} "
+        f"WHERE {timesheet}.{qn('employee_id')} = %s AND {timesheet}.{qn('week_start')} = %s "
+        f"AND {entry}.{qn('day')} = %s AND {employee}.{qn('is_active')} = %s"
+    )
+
+
+def _entry_id(employee_id: int, week_start, day: str) -> int | None:
+    """None: pas encore d'entrée aujourd'hui, ou employé inconnu / inactif."""
+    with connection.cursor() as cursor:
+        cursor.execute(_entry_sql(), [employee_id, connection.ops.adapt_datefield_value(week_start), day, True])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def record_punch(employee_id: int, at: datetime | None = None) -> PunchResult:
+    """
+    Idempotent: l'heure du pointage sert de clé. Un terminal qui réessaie doit renvoyer
+    le même `at`; si cette heure figure déjà dans un créneau, rien n'est écrit.
+    Lève Employee.DoesNotExist si l'employé est inconnu ou inactif.
+    """
+    at = timezone.localtime(at or timezone.now()).replace(microsecond=0)
+    t = at.time()
+    day = at.date()
+    week_start = day - timedelta(days=day.weekday())
+    day_code = DailyEntry.Weekday.for_date(day).value
+
+    # Lecture hors transaction: le verrou d'écriture n'est tenu que pour les écritures
+    entry_id = _entry_id(employee_id, week_start, day_code)
+
+    with _write_lock(), transaction.atomic():
+        if entry_id is None:
+            # Premier pointage du jour (ou employé à refuser): cas rare, une vérification de plus
+            if not Employee.objects.filter(pk=employee_id, is_active=True).exists():
+                raise Employee.DoesNotExist(f"Employé actif introuvable: {employee_id}.")
+            timesheet, _ = WeeklyTimesheet.objects.get_or_create(employee_id=employee_id, week_start=week_start)
+            entry, _ = DailyEntry.objects.get_or_create(timesheet=timesheet, day=day_code)
+            entry_id = entry.pk
+
+        value = connection.ops.adapt_timefield_value(t)
+        n = len(DailyEntry.TIME_FIELDS)
+        # raw(): les colonnes renvoyées passent par les convertisseurs du backend (heures, dates)
+        written = list(DailyEntry.objects.raw(_punch_sql(), [value] * n + [entry_id] + [value] * n))
+        if written:
+            entry = written[0]
+            ChangeLogEntry.record(entry, ChangeLogEntry.Action.UPDATE)
+        else:
+            # Réessai ou journée complète: rien n'a été écrit, relire pour répondre
+            entry = DailyEntry.objects.get(pk=entry_id)
+
+    slot = next((s for s in DailyEntry.TIME_FIELDS if getattr(entry, s) == t), None)
+    return PunchResult(entry=entry, slot=slot, replayed=not written and slot is not None)
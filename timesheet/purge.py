@@ -0,0 +1,62 @@
+"""
+Suppression par lots des feuilles de temps et de leurs entrées.
+
+Le CASCADE de Django charge tous les objets liés en mémoire et supprime tout dans une
+seule transaction, ce qui bloque les autres écritures SQLite pendant toute la durée.
+Ici chaque lot est une transaction courte de quelques DELETE directs (`_raw_delete`),
+et le journal des changements reçoit les suppressions dans la même transaction.
+"""
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+
+from django.db import transaction
+
+from .models import ChangeLogEntry, DailyEntry, WeeklyTimesheet
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _log_deletes(model, pks) -> None:
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=model._meta.model_name, object_pk=pk, action=ChangeLogEntry.Action.DELETE)
+        for pk in pks
+    ])
+
+
+def purge_timesheets(
+    timesheets,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause: float = 0.0,
+    progress: Callable[[int, int], None] | None = None,
+) -> tuple[int, int]:
+    """
+    Supprime les feuilles du queryset `timesheets` (et leurs entrées) par lots de `batch_size`.
+    `pause` (secondes) laisse passer les autres écritures entre deux lots.
+    Retourne (feuilles supprimées, entrées supprimées).
+    """
+    deleted_timesheets = deleted_entries = 0
+    batch_ids = timesheets.order_by("pk").values_list("pk", flat=True)
+
+    while True:
+        with transaction.atomic():
+            ts_ids = list(batch_ids[:batch_size])
+            if not ts_ids:
+                break
+
+            entries = DailyEntry.objects.filter(timesheet_id__in=ts_ids)
+            entry_ids = list(entries.values_list("pk", flat=True))
+            _log_deletes(DailyEntry, entry_ids)
+            deleted_entries += entries._raw_delete(entries.db)
+
+            sheets = WeeklyTimesheet.objects.filter(pk__in=ts_ids)
+            _log_deletes(WeeklyTimesheet, ts_ids)
+            deleted_timesheets += sheets._raw_delete(sheets.db)
+
+        if progress:
+            progress(deleted_timesheets, deleted_entries)
+        if pause:
+            time.sleep(pause)
+
+    return deleted_timesheets, deleted_entries
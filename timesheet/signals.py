@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import ChangeLogEntry, Employee, WeeklyTimesheet, DailyEntry
+
+
+# post_delete est envoyé à l'intérieur de la transaction du Collector:
+# les suppressions en cascade sont donc journalisées de façon atomique.
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=WeeklyTimesheet)
+@receiver(post_delete, sender=DailyEntry)
+def log_delete(sender, instance, **kwargs):
+    ChangeLogEntry.record(instance, ChangeLogEntry.Action.DELETE)
@@ -1,3 +1,460 @@
-from django.test import TestCase
+from datetime import date, datetime, time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.admin import helpers
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import views
+from .models import CalendarDay, CalendarWeek, ChangeLogEntry, DailyEntry, Employee, WeeklyTimesheet
+from .loadtest import latency_summary, percentile
+from .periods import PERIODS, build_calendar, hours_by_period
+from .purge import purge_timesheets
+from .punch import record_punch
+from .weeks import load_weeks
+
+
+@override_settings(CHANGE_FEED_TOKEN="secret-paie")
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.url = reverse("timesheet:change_feed")
+        self.employee = Employee.objects.create(name="Alice")
+
+    def test_missing_token_is_401_json(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("error", response.json())
+
+    def test_wrong_token_is_403_json(self):
+        response = self.client.get(self.url, headers={"X-Feed-Token": "mauvais"})
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("error", response.json())
+
+    @override_settings(CHANGE_FEED_TOKEN="")
+    def test_unconfigured_token_refuses_everything(self):
+        response = self.client.get(self.url, headers={"X-Feed-Token": "n'importe quoi"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_valid_token_returns_changes_after_cursor(self):
+        headers = {"X-Feed-Token": "secret-paie"}
+        first = self.client.get(self.url, headers=headers).json()
+        self.assertEqual([c["object_pk"] for c in first["results"]], [self.employee.pk])
+
+        self.employee.name = "Alice B."
+        self.employee.save()
+        second = self.client.get(self.url, {"since": first["next_cursor"]}, headers=headers).json()
+        self.assertEqual([c["action"] for c in second["results"]], [ChangeLogEntry.Action.UPDATE])
+        self.assertFalse(second["has_more"])
+
+    def test_derived_columns_are_not_logged(self):
+        timesheet = WeeklyTimesheet.objects.create(employee=self.employee, week_start=date(2024, 3, 4))
+        entry = DailyEntry.objects.create(timesheet=timesheet, day="TUE", arrival_morning=time(8), lunch_departure=time(12))
+        self.assertNotIn("search_name", ChangeLogEntry.objects.get(model="employee").data)
+        data = ChangeLogEntry.objects.get(model="dailyentry", object_pk=entry.pk).data
+        self.assertEqual((data["day"], data["arrival_morning"]), ("TUE", "08:00:00"))
+        self.assertFalse({"day_order", "work_date"} & data.keys())
+
+
+class TimesheetCreateFormTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user("gestion"))
+
+    def test_non_numeric_employee_is_a_form_error(self):
+        response = self.client.post(reverse("timesheet:timesheet_create"), {"employee": "abc", "week_start": "2024-01-01"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("employee", response.context["form"].errors)
+
+    def test_selected_employee_label_is_rendered(self):
+        employee = Employee.objects.create(name="Éloïse Côté")
+        WeeklyTimesheet.objects.create(employee=employee, week_start=date(2024, 1, 1))
+        # Doublon: le formulaire est réaffiché avec l'employé choisi
+        response = self.client.post(reverse("timesheet:timesheet_create"), {"employee": employee.pk, "week_start": "2024-01-01"})
+        self.assertContains(response, "Éloïse Côté")
+
+
+@override_settings(PUNCH_TERMINAL_TOKEN="terminal-1")
+class PunchTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(name="Bob")
+        self.day = timezone.make_aware(datetime(2024, 3, 5))  # mardi
+        self.url = reverse("timesheet:punch")
+
+    def at(self, hour, minute=0):
+        return self.day.replace(hour=hour, minute=minute)
+
+    def post(self, at, token="terminal-1"):
+        return self.client.post(
+            self.url,
+            {"employee": self.employee.pk, "at": at.isoformat()},
+            headers={"X-Terminal-Token": token},
+        )
+
+    def test_fills_slots_in_order_and_creates_the_week(self):
+        hours = (8, 12, 13, 17, 21)
+        slots = [record_punch(self.employee.pk, self.at(h)).slot for h in hours]
+        self.assertEqual(slots, list(DailyEntry.TIME_FIELDS))
+
+        entry = DailyEntry.objects.get(timesheet__employee=self.employee)
+        self.assertEqual((entry.timesheet.week_start, entry.day), (date(2024, 3, 4), "TUE"))
+        self.assertEqual([getattr(entry, s) for s in DailyEntry.TIME_FIELDS], [time(h) for h in hours])
+
+    def test_replay_is_a_no_op(self):
+        record_punch(self.employee.pk, self.at(8))
+        record_punch(self.employee.pk, self.at(12))
+        changes = ChangeLogEntry.objects.count()
+
+        replay = record_punch(self.employee.pk, self.at(8))
+
+        self.assertEqual((replay.slot, replay.replayed), ("arrival_morning", True))
+        self.assertEqual(replay.entry.lunch_return, None)
+        self.assertEqual(ChangeLogEntry.objects.count(), changes)
+
+    def test_endpoint_full_day_is_409(self):
+        for h in (8, 12, 13, 17, 21):
+            self.assertEqual(self.post(self.at(h)).status_code, 200)
+
+        replay = self.post(self.at(21))
+        self.assertEqual((replay.status_code, replay.json()["replayed"]), (200, True))
+        self.assertEqual(self.post(self.at(22)).status_code, 409)
+
+    def test_endpoint_requires_terminal_token(self):
+        self.assertEqual(self.client.post(self.url, {"employee": self.employee.pk}).status_code, 401)
+        self.assertEqual(self.post(self.at(8), token="autre").status_code, 403)
+        self.assertFalse(DailyEntry.objects.exists())
+
+
+class AnomalyReportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user("gestion"))
+        employee = Employee.objects.create(name="Carole")
+        self.timesheet = WeeklyTimesheet.objects.create(employee=employee, week_start=date(2024, 3, 4))
+
+    def test_page_reads_the_last_saved_scan_without_scanning(self):
+        call_command("scan_anomalies", stdout=StringIO())
+        with self.assertNumQueries(3):  # session, utilisateur, dernière analyse
+            response = self.client.get(reverse("timesheet:anomaly_report"))
+        self.assertContains(response, "Semaine sans heures saisies")
+        self.assertContains(response, reverse("timesheet:timesheet_detail", args=[self.timesheet.pk]))
+        self.assertEqual(response.context["scan"].total, 1)
+
+    def test_page_without_scan(self):
+        response = self.client.get(reverse("timesheet:anomaly_report"))
+        self.assertContains(response, "Aucune analyse enregistrée")
+
+    def test_chunk_size_must_be_positive(self):
+        with self.assertRaises(CommandError):
+            call_command("scan_anomalies", "--chunk-size", "0", stdout=StringIO())
+
+
+class PurgeAdminActionTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin"))
+        self.employee = Employee.objects.create(name="Denis")
+        self.timesheet = WeeklyTimesheet.objects.create(employee=self.employee, week_start=date(2024, 3, 4))
+        DailyEntry.objects.create(timesheet=self.timesheet, day="MON")
+
+    def run_action(self, model, action, pk, confirm):
+        data = {"action": action, helpers.ACTION_CHECKBOX_NAME: [pk]}
+        if confirm:
+            data["post"] = "yes"
+        return self.client.post(reverse(f"admin:timesheet_{model}_changelist"), data)
+
+    def test_employee_purge_asks_for_confirmation_first(self):
+        response = self.run_action("employee", "purge_with_history", self.employee.pk, confirm=False)
+        self.assertTemplateUsed(response, "admin/timesheet/purge_confirmation.html")
+        self.assertEqual(response.context["summary"], [
+            ("Employés", 1), ("Feuilles de temps", 1), ("Entrées journalières", 1),
+        ])
+        self.assertTrue(Employee.objects.exists())
+        self.assertFalse(LogEntry.objects.exists())
+
+    def test_confirmed_employee_purge_deletes_and_logs(self):
+        response = self.run_action("employee", "purge_with_history", self.employee.pk, confirm=True)
+        self.assertRedirects(response, reverse("admin:timesheet_employee_changelist"))
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(DailyEntry.objects.exists())
+        log = LogEntry.objects.get()
+        self.assertEqual((log.action_flag, log.object_id), (DELETION, str(self.employee.pk)))
+
+    def test_confirmed_timesheet_purge_deletes_and_logs(self):
+        self.assertEqual(
+            self.run_action("weeklytimesheet", "purge_selected", self.timesheet.pk, confirm=False).status_code, 200,
+        )
+        self.assertTrue(WeeklyTimesheet.objects.exists())
+
+        self.run_action("weeklytimesheet", "purge_selected", self.timesheet.pk, confirm=True)
+        self.assertFalse(WeeklyTimesheet.objects.exists())
+        self.assertEqual(LogEntry.objects.get().object_repr, str(self.timesheet))
+
+    def test_delete_selected_is_replaced_by_the_purge_actions(self):
+        for model in ("employee", "weeklytimesheet"):
+            response = self.client.get(reverse(f"admin:timesheet_{model}_changelist"))
+            actions = [name for name, _ in response.context["action_form"].fields["action"].choices]
+            self.assertNotIn("delete_selected", actions)
+
+    def test_delete_view_purges_in_batches(self):
+        with mock.patch("timesheet.admin.purge_timesheets", wraps=purge_timesheets) as purge:
+            response = self.client.post(reverse("admin:timesheet_employee_delete", args=[self.employee.pk]), {"post": "yes"})
+        self.assertRedirects(response, reverse("admin:timesheet_employee_changelist"))
+        purge.assert_called_once()
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(DailyEntry.objects.exists())
+        self.assertEqual(LogEntry.objects.get().action_flag, DELETION)
+
+
+class PurgeCommandTests(TestCase):
+    def test_rejects_invalid_options(self):
+        for args in (["--older-than-days", "0"], ["--before", "2024-01-01", "--pause", "-1"], ["--before", "2024-01-01", "--batch-size", "0"]):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                call_command("purge_timesheets", *args, stdout=StringIO())
+
+
+@mock.patch.object(views, "CSV_EXPORT_ROWS_PER_CHUNK", 2)
+class CsvExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("gestion")
+        employee = Employee.objects.create(name="Émile")
+        timesheet = WeeklyTimesheet.objects.create(employee=employee, week_start=date(2024, 3, 4))
+        for day in ("MON", "TUE", "WED"):
+            DailyEntry.objects.create(
+                timesheet=timesheet, day=day,
+                arrival_morning=time(8), lunch_departure=time(12), lunch_return=time(13),
+                arrival_evening=time(13), departure_evening=time(16, 30),
+            )
+        self.url = reverse("timesheet:export_timesheets_csv")
+
+    def test_requires_login(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_sync_and_async_streams_are_identical(self):
+        self.client.force_login(self.user)
+        chunks = list(self.client.get(self.url).streaming_content)
+        self.assertEqual(len(chunks), 2)
+        sync_body = b"".join(chunks).decode()
+
+        async def fetch():
+            await self.async_client.aforce_login(self.user)
+            response = await self.async_client.get(self.url)
+            return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(async_to_sync(fetch)(), sync_body)
+        lines = sync_body.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1], "Émile,2024-03-04,Lundi,08:00:00,12:00:00,13:00:00,13:00:00,16:30:00,7.5")
+
+
+class WeekViewTests(TestCase):
+    def test_over_cap_week_matches_the_model(self):
+        employee = Employee.objects.create(name="Fanny", weekly_regular_hours=Decimal("40.00"))
+        timesheet = WeeklyTimesheet.objects.create(employee=employee, week_start=date(2024, 3, 4))
+        for day in ("FRI", "MON", "WED", "TUE", "THU"):  # 9 h 30 par jour, créées dans le désordre
+            DailyEntry.objects.create(
+                timesheet=timesheet, day=day,
+                **dict(zip(DailyEntry.TIME_FIELDS, (time(7), time(12), time(12, 30), time(12, 30), time(17, 0, 30)))),
+            )
+
+        week = load_weeks(WeeklyTimesheet.objects.all())[0]
+        self.assertEqual([d.day for d in week.days], ["MON", "TUE", "WED", "THU", "FRI"])
+        for attr in ("total_minutes", "total_hours_decimal", "regular_hours", "banked_hours"):
+            self.assertEqual(getattr(week, attr), getattr(timesheet, attr), attr)
+        self.assertEqual((week.regular_hours, week.banked_hours), (Decimal("40.00"), Decimal("7.50")))
+
+
+class HoursByPeriodTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(name="Fanny")
+        self.timesheet = WeeklyTimesheet.objects.create(employee=self.employee, week_start=date(2024, 3, 4))
+
+    def entry(self, day, *times):
+        return DailyEntry.objects.create(timesheet=self.timesheet, day=day, **dict(zip(DailyEntry.TIME_FIELDS, times)))
+
+    def test_reversed_block_counts_as_zero_like_total_minutes(self):
+        self.entry("MON", time(8), time(12), time(13), time(13), time(17))
+        # Bloc du soir inversé (pointages dans le désordre): 0, comme DailyEntry._duration
+        self.entry("TUE", time(8), time(12), time(12, 30), time(17), time(13))
+
+        rows = hours_by_period("month", date(2024, 3, 1), date(2024, 3, 31))
+
+        self.assertEqual([r["minutes"] for r in rows], [self.timesheet.total_minutes])
+        self.assertEqual(rows[0]["minutes"], 720)
+        self.assertEqual(load_weeks(WeeklyTimesheet.objects.all())[0].total_minutes, 720)
+
+    def test_periods_agree_on_the_total(self):
+        self.entry("FRI", time(8), time(12), time(13), time(13), time(17, 15))
+        other = WeeklyTimesheet.objects.create(employee=self.employee, week_start=date(2024, 4, 1))
+        DailyEntry.objects.create(timesheet=other, day="MON", arrival_morning=time(9), lunch_departure=time(11))
+
+        expected = self.timesheet.total_minutes + other.total_minutes
+        for period in PERIODS:
+            rows = hours_by_period(period, date(2024, 1, 1), date(2024, 12, 31))
+            self.assertEqual(sum(r["minutes"] for r in rows), expected, period)
+
+    def test_build_calendar_recomputes_pay_periods(self):
+        self.entry("MON", time(8), time(12))
+        with override_settings(PAY_PERIOD_WEEKS=1):
+            build_calendar(date(2024, 3, 4), date(2024, 3, 10))
+            rows = hours_by_period("pay_period", date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual([r["period"] for r in rows], ["2024-03-04"])
+        self.assertEqual(CalendarWeek.objects.get(week_start=date(2024, 3, 4)).pay_period_start, date(2024, 3, 4))
+
+        build_calendar(date(2024, 3, 4), date(2024, 3, 10))
+        rows = hours_by_period("pay_period", date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual([r["period"] for r in rows], ["2024-02-26"])
+
+    def test_work_date_follows_day_and_week_start(self):
+        entry = self.entry("WED", time(8), time(12))
+        self.assertEqual(entry.work_date_id, date(2024, 3, 6))
+
+        self.timesheet.week_start = date(2024, 3, 11)
+        self.timesheet.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.work_date_id, date(2024, 3, 13))
+
+        with self.assertNumQueries(2):  # contrôle du calendrier, puis le cumul
+            rows = hours_by_period("iso_week", date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual([(r["period"], r["minutes"]) for r in rows], [("2024-S11", 240)])
+
+    def test_entry_dates_are_rewritten_only_when_the_week_moves(self):
+        self.entry("WED", time(8), time(12))
+        timesheet = WeeklyTimesheet.objects.get(pk=self.timesheet.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            timesheet.save()
+        self.assertFalse([q for q in ctx.captured_queries if "dailyentry" in q["sql"]])
+
+        timesheet.week_start = date(2024, 3, 11)
+        with CaptureQueriesContext(connection) as ctx:
+            timesheet.save()
+        self.assertEqual(len([q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "timesheet_dailyentry"')]), 1)
+
+    def test_entries_outside_the_initial_calendar_are_counted(self):
+        old = WeeklyTimesheet.objects.create(employee=self.employee, week_start=date(2019, 12, 23))
+        DailyEntry.objects.create(timesheet=old, day="MON", arrival_morning=time(8), lunch_departure=time(12))
+        self.assertFalse(CalendarDay.objects.filter(date=date(2019, 12, 23)).exists())
+
+        rows = hours_by_period("iso_week", date(2019, 1, 1), date(2019, 12, 31))
+
+        self.assertEqual([(r["period"], r["minutes"]) for r in rows], [("2019-S52", 240)])
+        self.assertTrue(CalendarDay.objects.filter(date=date(2019, 1, 1)).exists())
+
+
+class HoursReportViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user("gestion"))
+
+    def test_out_of_range_year_is_reported_not_a_500(self):
+        for year in ("99999", "0", "abc"):
+            response = self.client.get(reverse("timesheet:hours_report"), {"year": year})
+            self.assertEqual(response.status_code, 200, year)
+            self.assertContains(response, "Année invalide")
+            self.assertEqual(response.context["year"], date.today().year)
+
+
+class EmployeeSearchTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user("gestion"))
+        self.url = reverse("timesheet:employee_search")
+
+    def search(self, **params):
+        return self.client.get(self.url, params).json()
+
+    def test_prefix_match_ignores_accents_and_case(self):
+        Employee.objects.create(name="Éloïse Côté")
+        Employee.objects.create(name="Eric Martin")
+        Employee.objects.create(name="Noémie Éloi")
+
+        self.assertEqual([r["name"] for r in self.search(q="ELOI")["results"]], ["Éloïse Côté"])
+        self.assertEqual([r["name"] for r in self.search(q="é")["results"]], ["Éloïse Côté", "Eric Martin"])
+
+    def test_inactive_employees_are_excluded(self):
+        Employee.objects.create(name="Gilles Actif")
+        Employee.objects.create(name="Gilles Parti", is_active=False)
+        self.assertEqual([r["name"] for r in self.search(q="gilles")["results"]], ["Gilles Actif"])
+
+    def test_results_are_paged_by_twenty(self):
+        for i in range(25):
+            Employee.objects.create(name=f"Hélène {i:02d}")
+
+        first = self.search(q="helene")
+        self.assertEqual((len(first["results"]), first["page"], first["has_more"]), (20, 1, True))
+        self.assertEqual(first["results"][0]["name"], "Hélène 00")
+
+        second = self.search(q="helene", page=2)
+        self.assertEqual((len(second["results"]), second["has_more"]), (5, False))
+        self.assertEqual(second["results"][-1]["name"], "Hélène 24")
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class LoadTestToolsTests(TestCase):
+    def test_percentile_is_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 0.50), 50.0)
+        self.assertEqual(percentile(values, 0.95), 95.0)
+        self.assertEqual(percentile(values, 0.07), 7.0)
+        self.assertEqual(percentile(values, 1.0), 100.0)
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 0.5), 2.0)
+        self.assertEqual(percentile([5.0], 0.99), 5.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_latency_summary(self):
+        summary = latency_summary([0.003, 0.001, 0.004, 0.0015, 7.0])
+        self.assertEqual(
+            {k: summary[k] for k in ("count", "p50_ms", "p95_ms", "max_ms")},
+            {"count": 5, "p50_ms": 3.0, "p95_ms": 7000.0, "max_ms": 7000.0},
+        )
+        self.assertEqual(summary["mean_ms"], 1401.9)
+        self.assertEqual(summary["histogram"]["<=1ms"], 1)
+        self.assertEqual(summary["histogram"]["<=2ms"], 1)
+        self.assertEqual(summary["histogram"]["<=5ms"], 2)
+        self.assertEqual(summary["histogram"][">5000ms"], 1)
+        self.assertEqual(latency_summary([])["p99_ms"], 0.0)
+
+    @override_settings(LOADTEST_SCRATCH_DATABASE=False)
+    def test_harnesses_refuse_a_database_not_declared_scratch(self):
+        for args in (["http_loadtest"], ["punch_loadtest"], ["export_benchmark", "--url", "http://127.0.0.1:8000"]):
+            with self.subTest(command=args[0]), self.assertRaisesMessage(CommandError, "jetable"):
+                call_command(*args, stdout=StringIO())
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(ChangeLogEntry.objects.exists())
+
+
+@override_settings(PUNCH_TERMINAL_TOKEN="terminal-1")
+class PunchStatementTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(name="Bruno")
+        self.at = timezone.make_aware(datetime(2024, 3, 5, 8))
+
+    def test_punch_on_existing_entry_is_lookup_update_returning_and_log(self):
+        record_punch(self.employee.pk, self.at)
+        with CaptureQueriesContext(connection) as ctx:
+            result = record_punch(self.employee.pk, self.at.replace(hour=12))
+        # Hors SAVEPOINT / RELEASE (BEGIN / COMMIT hors TestCase)
+        statements = [q["sql"].split()[0] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(statements, ["SELECT", "UPDATE", "INSERT"])
+        self.assertEqual((result.slot, result.replayed), ("lunch_departure", False))
+        self.assertEqual(result.entry.lunch_departure, time(12))
+        log = ChangeLogEntry.objects.filter(model="dailyentry").last()
+        self.assertEqual((log.data["arrival_morning"], log.data["lunch_departure"]), ("08:00:00", "12:00:00"))
+
+    def test_inactive_employee_is_404_and_writes_nothing(self):
+        self.employee.is_active = False
+        self.employee.save()
+        response = self.client.post(
+            reverse("timesheet:punch"),
+            {"employee": self.employee.pk, "at": self.at.isoformat()},
+            headers={"X-Terminal-Token": "terminal-1"},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(WeeklyTimesheet.objects.exists())
@@ -6,9 +6,15 @@ app_name = "timesheet"
 urlpatterns = [
     path("", views.home, name="home"),  # page principale
     path("employees/", views.employee_list, name="employee_list"),
+    path("api/employees/search/", views.employee_search, name="employee_search"),
     path("timesheets/", views.timesheet_list, name="timesheet_list"),
     path("timesheets/new/", views.timesheet_create, name="timesheet_create"),
     path("timesheets/<int:pk>/", views.timesheet_detail, name="timesheet_detail"),
     path("payroll/summary/", views.payroll_summary, name="payroll_summary"),
+    path("anomalies/", views.anomaly_report, name="anomaly_report"),
+    path("reports/hours/", views.hours_report, name="hours_report"),
     path("timesheets/<int:pk>/export/", views.export_timesheet_excel, name="export_timesheet_excel"),
+    path("timesheets/export.csv", views.export_timesheets_csv, name="export_timesheets_csv"),
+    path("api/changes/", views.change_feed, name="change_feed"),
+    path("api/punch/", views.punch, name="punch"),
 ]
\ No newline at end of file
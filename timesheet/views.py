@@ -4,45 +4,98 @@ from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
 from django.forms import modelformset_factory
 from decimal import Decimal
-from django.db.models import Prefetch, Case, When, IntegerField
 from datetime import timedelta
 from datetime import date
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from io import BytesIO
+import csv
 import openpyxl
 from openpyxl.styles import Font
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+import hmac
 
 # Create your views here.
 
-from .models import Employee, WeeklyTimesheet, DailyEntry
+from .models import Employee, WeeklyTimesheet, DailyEntry, ChangeLogEntry, AnomalyScan
 from .forms import WeeklyTimesheetForm, DailyEntryForm
-
-weekday_order = Case(
-    When(day="MON", then=1),
-    When(day="TUE", then=2),
-    When(day="WED", then=3),
-    When(day="THU", then=4),
-    When(day="FRI", then=5),
-    When(day="SAT", then=6),
-    When(day="SUN", then=7),
-    output_field=IntegerField(),
-)
+from .punch import record_punch
+from .weeks import DayPunches, aload_weeks, load_weeks
+from .periods import PERIODS, PERIOD_LABELS, hours_by_period
+
+EMPLOYEE_LIST_PAGE_SIZE = 50
+EMPLOYEE_SEARCH_PAGE_SIZE = 20
+
+CSV_EXPORT_ROWS_PER_CHUNK = 500
+CSV_EXPORT_HEADERS = [
+    "Employé",
+    "Semaine",
+    "Jour",
+    "Arrivée matin",
+    "Départ dîner",
+    "Retour dîner",
+    "Arrivée soir",
+    "Départ soir",
+    "Total (h)",
+]
+
+# Bornes de l'année du rapport d'heures (le calendrier est prolongé à la demande dans cette plage)
+HOURS_REPORT_MIN_YEAR = 1900
+HOURS_REPORT_MAX_YEAR = 2100
+
+CHANGE_FEED_PAGE_SIZE = 500
+CHANGE_FEED_MAX_PAGE_SIZE = 5000
 
 def home(request):
     return render(request, "timesheet/home.html")
 
 
 def employee_list(request):
-    employees = Employee.objects.filter(is_active=True)
+    q = request.GET.get("q", "").strip()
+    employees = Employee.search(q).filter(is_active=True)
+    page = Paginator(employees, EMPLOYEE_LIST_PAGE_SIZE).get_page(request.GET.get("page"))
     return render(request, "timesheet/employee_list.html", {
-        "employees": employees
+        "employees": page.object_list,
+        "page": page,
+        "q": q,
     })
 
 
-def timesheet_list(request):
+@login_required
+def employee_search(request):
+    """Autocomplétion: préfixe du nom, actifs seulement, résultats paginés et bornés."""
+    q = request.GET.get("q", "").strip()
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        page = 1
+
+    offset = (page - 1) * EMPLOYEE_SEARCH_PAGE_SIZE
+    results = list(
+        Employee.search(q)
+        .filter(is_active=True)
+        .values("id", "name")[offset:offset + EMPLOYEE_SEARCH_PAGE_SIZE + 1]
+    )
+    has_more = len(results) > EMPLOYEE_SEARCH_PAGE_SIZE
+
+    return JsonResponse({
+        "results": results[:EMPLOYEE_SEARCH_PAGE_SIZE],
+        "page": page,
+        "has_more": has_more,
+    })
+
+
+async def timesheet_list(request):
     sort = request.GET.get("sort", "date")  # date par défaut
 
-    timesheets = WeeklyTimesheet.objects.select_related("employee")
+    timesheets = WeeklyTimesheet.objects.all()
 
     if sort == "name":
         timesheets = timesheets.order_by("employee__name", "-week_start")
@@ -50,7 +103,7 @@ def timesheet_list(request):
         timesheets = timesheets.order_by("-week_start", "employee__name")
 
     return render(request, "timesheet/timesheet_list.html", {
-        "timesheets": timesheets,
+        "timesheets": await aload_weeks(timesheets),
         "sort": sort,
     })
 
@@ -85,11 +138,7 @@ def timesheet_detail(request, pk):
     for day_code, _ in DailyEntry.Weekday.choices:
         DailyEntry.objects.get_or_create(timesheet=timesheet, day=day_code)
 
-    queryset = (
-        timesheet.entries.all()
-        .annotate(day_order=weekday_order)
-        .order_by("day_order")
-    )
+    queryset = timesheet.entries.all().order_by("day_order")
 
     DailyEntryFormSet = modelformset_factory(DailyEntry, form=DailyEntryForm, extra=0)
 
@@ -103,36 +152,39 @@ def timesheet_detail(request, pk):
         formset = DailyEntryFormSet(queryset=queryset)
 
     # ✅ Totaux employé (toutes les semaines) — optimisé
-    timesheets = (
+    weeks = load_weeks(
         WeeklyTimesheet.objects
         .filter(employee=employee)
         .order_by("-week_start")
-        .prefetch_related("entries")
     )
 
     total_hours = Decimal("0.00")
     total_regular = Decimal("0.00")
     total_banked = Decimal("0.00")
+    week = None
 
-    for ts in timesheets:
-        total_hours += ts.total_hours_decimal
-        total_regular += ts.regular_hours
-        total_banked += ts.banked_hours
+    for w in weeks:
+        total_hours += w.total_hours_decimal
+        total_regular += w.regular_hours
+        total_banked += w.banked_hours
+        if w.timesheet_id == timesheet.pk:
+            week = w
 
     total_pay = (total_regular * employee.hourly_rate).quantize(Decimal("0.01"))
 
     return render(request, "timesheet/timesheet_detail.html", {
         "timesheet": timesheet,
+        "week": week,
         "formset": formset,
         "total_hours": total_hours,
         "total_banked": total_banked,
         "total_pay": total_pay,
     })
 
-def payroll_summary(request):
-    employees = Employee.objects.filter(is_active=True).prefetch_related(
-        Prefetch("timesheets", queryset=WeeklyTimesheet.objects.all().order_by("-week_start"))
-    )
+def _payroll_context(employees, weeks) -> dict:
+    weeks_by_employee = {}
+    for week in weeks:
+        weeks_by_employee.setdefault(week.employee_id, []).append(week)
 
     rows = []
     grand_total_hours = Decimal("0.00")
@@ -145,7 +197,7 @@ def payroll_summary(request):
         regular_hours = Decimal("0.00")
         banked_hours = Decimal("0.00")
 
-        for ts in emp.timesheets.all():
+        for ts in weeks_by_employee.get(emp.pk, []):
             total_hours += ts.total_hours_decimal
             regular_hours += ts.regular_hours
             banked_hours += ts.banked_hours
@@ -166,25 +218,27 @@ def payroll_summary(request):
             "pay_total": pay_total,
         })
 
-    context = {
+    return {
         "rows": rows,
         "grand_total_hours": grand_total_hours,
         "grand_regular_hours": grand_regular_hours,
         "grand_banked_hours": grand_banked_hours,
         "grand_pay": grand_pay.quantize(Decimal("0.01")),
     }
-    return render(request, "timesheet/payroll_summary.html", context)
 
-def export_timesheet_excel(request, pk):
-    timesheet = get_object_or_404(WeeklyTimesheet, pk=pk)
+async def payroll_summary(request):
+    employees = [emp async for emp in Employee.objects.filter(is_active=True)]
+    weeks = await aload_weeks(WeeklyTimesheet.objects.filter(employee__is_active=True))
+    return render(request, "timesheet/payroll_summary.html", _payroll_context(employees, weeks))
 
+def _timesheet_workbook(timesheet) -> bytes:
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Feuille de temps"
 
     # Titre
     ws["A1"] = "Employé"
-    ws["B1"] = timesheet.employee.name
+    ws["B1"] = timesheet.employee_name
 
     ws["A2"] = "Semaine"
     ws["B2"] = f"{timesheet.week_start} → {timesheet.week_end}"
@@ -207,26 +261,220 @@ def export_timesheet_excel(request, pk):
         cell.font = Font(bold=True)
 
     # Données
-    entries = timesheet.entries.all().annotate(day_order=weekday_order).order_by("day_order")
-
-    for entry in entries:
-        ws.append([
-            entry.get_day_display(),
-            entry.arrival_morning,
-            entry.lunch_departure,
-            entry.lunch_return,
-            entry.arrival_evening,
-            entry.departure_evening,
-            entry.total_hours,
-        ])
+    for day in timesheet.days:
+        ws.append([day.get_day_display(), *day.times(), day.total_hours])
 
     ws.append([])
     ws.append(["Total semaine", "", "", "", "", "", timesheet.total_hours_decimal])
 
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+async def export_timesheet_excel(request, pk):
+    weeks = await aload_weeks(WeeklyTimesheet.objects.filter(pk=pk))
+    if not weeks:
+        raise Http404("Feuille de temps introuvable.")
+    timesheet = weeks[0]
+
+    # openpyxl est synchrone et CPU: hors de la boucle d'événements
+    content = await sync_to_async(_timesheet_workbook, thread_sensitive=False)(timesheet)
+
     response = HttpResponse(
+        content,
         content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
     response["Content-Disposition"] = f'attachment; filename="timesheet_{timesheet.pk}.xlsx"'
+    return response
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer: renvoie la ligne au lieu de l'écrire."""
+    def write(self, value):
+        return value
+
+
+class _CsvChunks:
+    """Formatage et découpage de l'export CSV; seule l'itération (for / async for) diffère entre WSGI et ASGI."""
+    def __init__(self):
+        self.writer = csv.writer(_Echo())
+        self.rows = [self.writer.writerow(CSV_EXPORT_HEADERS)]
+
+    def add(self, row) -> str | None:
+        """Ajoute une entrée; renvoie le morceau à envoyer quand il est plein."""
+        name, week_start, day, *times = row
+        punches = DayPunches(day, *times)
+        self.rows.append(self.writer.writerow([name, week_start, punches.get_day_display(), *times, punches.total_hours]))
+        if len(self.rows) >= CSV_EXPORT_ROWS_PER_CHUNK:
+            return self.flush()
+        return None
+
+    def flush(self) -> str | None:
+        chunk, self.rows = "".join(self.rows), []
+        return chunk or None
+
+
+def _csv_chunks(rows):
+    chunks = _CsvChunks()
+    for row in rows:
+        if chunk := chunks.add(row):
+            yield chunk
+    if chunk := chunks.flush():
+        yield chunk
+
 
-    wb.save(response)
-    return response
\ No newline at end of file
+async def _acsv_chunks(rows):
+    chunks = _CsvChunks()
+    async for row in rows:
+        if chunk := chunks.add(row):
+            yield chunk
+    if chunk := chunks.flush():
+        yield chunk
+
+
+@login_required
+async def export_timesheets_csv(request):
+    """
+    Export CSV de toutes les entrées, diffusé au fil de la lecture (mémoire constante).
+    Sous ASGI le flux est un itérateur asynchrone: un téléchargement lent n'occupe pas de thread.
+    """
+    # Ordre de l'index (timesheet_id, day_order): pas de tri temporaire, la première ligne part tout de suite
+    entries = (
+        DailyEntry.objects
+        .order_by("timesheet_id", "day_order")
+        # named=True: itérable générateur, requis pour que aiterator() exécute le SQL hors de la boucle
+        .values_list("timesheet__employee__name", "timesheet__week_start", "day", *DailyEntry.TIME_FIELDS, named=True)
+    )
+
+    if isinstance(request, ASGIRequest):
+        content = _acsv_chunks(entries.aiterator(chunk_size=CSV_EXPORT_ROWS_PER_CHUNK))
+    else:
+        # Sous WSGI, un itérateur asynchrone serait entièrement chargé en mémoire par Django
+        content = _csv_chunks(entries.iterator(chunk_size=CSV_EXPORT_ROWS_PER_CHUNK))
+
+    response = StreamingHttpResponse(content, content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="timesheets.csv"'
+    return response
+
+
+def _token_error(request, header: str, expected: str):
+    """
+    Authentification machine à machine par jeton partagé dans un en-tête.
+    None si le jeton est valide, sinon une réponse JSON 401 (absent) ou 403 (invalide ou non configuré).
+    """
+    token = request.headers.get(header, "")
+    if not token:
+        return JsonResponse({"error": f"En-tête {header} manquant."}, status=401)
+    if not expected or not hmac.compare_digest(token, expected):
+        return JsonResponse({"error": "Jeton non autorisé."}, status=403)
+    return None
+
+
+def change_feed(request):
+    """
+    Flux incrémental: renvoie les changements dont l'id > `since`, par ordre croissant.
+    Le client rappelle avec `since=next_cursor` tant que `has_more` est vrai.
+    Authentifié par le jeton CHANGE_FEED_TOKEN (en-tête X-Feed-Token), pas par session.
+    """
+    error = _token_error(request, "X-Feed-Token", settings.CHANGE_FEED_TOKEN)
+    if error:
+        return error
+
+    try:
+        since = int(request.GET.get("since", 0))
+        limit = int(request.GET.get("limit", CHANGE_FEED_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "Les paramètres since et limit doivent être des entiers."}, status=400)
+
+    limit = max(1, min(limit, CHANGE_FEED_MAX_PAGE_SIZE))
+
+    # Parcours par clé primaire: le coût suit le nombre de changements, pas la taille de l'historique
+    changes = list(
+        ChangeLogEntry.objects
+        .filter(pk__gt=since)
+        .order_by("pk")
+        .values("id", "model", "object_pk", "action", "data", "created_at")[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return JsonResponse({
+        "results": changes,
+        "next_cursor": changes[-1]["id"] if changes else since,
+        "has_more": has_more,
+    })
+
+
+@login_required
+def anomaly_report(request):
+    """Dernier résultat de scan_anomalies: l'analyse des tables complètes ne se fait pas pendant la requête."""
+    return render(request, "timesheet/anomaly_report.html", {
+        "scan": AnomalyScan.objects.order_by("-finished_at").first(),
+    })
+
+
+@login_required
+def hours_report(request):
+    """Heures par employé et par mois / trimestre / semaine ISO / période de paie pour une année."""
+    period = request.GET.get("period", "month")
+    if period not in PERIODS:
+        period = "month"
+    error = None
+    try:
+        year = int(request.GET.get("year", date.today().year))
+    except ValueError:
+        year = None
+    if year is None or not HOURS_REPORT_MIN_YEAR <= year <= HOURS_REPORT_MAX_YEAR:
+        error = f"Année invalide : choisir entre {HOURS_REPORT_MIN_YEAR} et {HOURS_REPORT_MAX_YEAR}."
+        year = date.today().year
+
+    rows = hours_by_period(period, date(year, 1, 1), date(year, 12, 31))
+    return render(request, "timesheet/hours_report.html", {
+        "error": error,
+        "rows": rows,
+        "period": period,
+        "periods": PERIOD_LABELS,
+        "year": year,
+        "total_hours": sum((r["hours"] for r in rows), Decimal("0.00")),
+    })
+
+
+@csrf_exempt  # terminaux authentifiés par jeton, pas par session
+@require_POST
+def punch(request):
+    """
+    Pointage d'un terminal: POST employee=<id>&at=<ISO 8601 optionnel>.
+    Réessayer avec le même `at` est sans effet (réponse identique, replayed=true).
+    """
+    error = _token_error(request, "X-Terminal-Token", settings.PUNCH_TERMINAL_TOKEN)
+    if error:
+        return error
+
+    try:
+        employee_id = int(request.POST.get("employee", ""))
+    except ValueError:
+        return JsonResponse({"error": "Le paramètre employee doit être un entier."}, status=400)
+
+    at = None
+    if request.POST.get("at"):
+        at = parse_datetime(request.POST["at"])
+        if at is None:
+            return JsonResponse({"error": "Le paramètre at doit être une date ISO 8601."}, status=400)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+    try:
+        result = record_punch(employee_id, at)
+    except Employee.DoesNotExist:
+        return JsonResponse({"error": "Employé introuvable."}, status=404)
+    if result.slot is None:
+        return JsonResponse({"error": "Tous les pointages de la journée sont déjà enregistrés."}, status=409)
+
+    return JsonResponse({
+        "entry": result.entry.pk,
+        "timesheet": result.entry.timesheet_id,
+        "day": result.entry.day,
+        "slot": result.slot,
+        "time": getattr(result.entry, result.slot),
+        "replayed": result.replayed,
+    })
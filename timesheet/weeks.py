@@ -0,0 +1,159 @@
+"""
+Objets légers (__slots__) pour les calculs d'heures en lecture.
+
+Construits directement depuis des lignes `values_list` (deux requêtes pour N semaines),
+sans instances de modèle ni objets datetime/timedelta. Les pointages sont gardés en
+secondes depuis minuit (entiers) pour que les totaux restent identiques à
+DailyEntry.total_minutes même quand un pointage comporte des secondes.
+"""
+from __future__ import annotations
+
+from datetime import time, timedelta
+from decimal import Decimal
+
+from .models import DailyEntry
+
+DAY_LABELS = dict(DailyEntry.Weekday.choices)
+
+
+def _seconds(t: time | None) -> int | None:
+    return None if t is None else t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _duration(start: int | None, end: int | None) -> int:
+    if start is None or end is None or end < start:
+        return 0  # v1: pas de quart de nuit (comme DailyEntry._duration)
+    return end - start
+
+
+class DayPunches:
+    __slots__ = ("day",) + DailyEntry.TIME_FIELDS
+
+    def __init__(self, day, arrival_morning, lunch_departure, lunch_return, arrival_evening, departure_evening):
+        self.day = day
+        self.arrival_morning = _seconds(arrival_morning)
+        self.lunch_departure = _seconds(lunch_departure)
+        self.lunch_return = _seconds(lunch_return)
+        self.arrival_evening = _seconds(arrival_evening)
+        self.departure_evening = _seconds(departure_evening)
+
+    def get_day_display(self) -> str:
+        return DAY_LABELS.get(self.day, self.day)
+
+    def times(self) -> list[time | None]:
+        """Les pointages en objets time (pour l'affichage et l'export)."""
+        out = []
+        for field in DailyEntry.TIME_FIELDS:
+            s = getattr(self, field)
+            out.append(None if s is None else time(s // 3600, s % 3600 // 60, s % 60))
+        return out
+
+    @property
+    def total_minutes(self) -> int:
+        seconds = (
+            _duration(self.arrival_morning, self.lunch_departure)
+            + _duration(self.arrival_evening, self.departure_evening)
+        )
+        return seconds // 60
+
+    @property
+    def total_hours(self) -> float:
+        return round(self.total_minutes / 60, 2)
+
+
+class WeekView:
+    __slots__ = (
+        "timesheet_id",
+        "employee_id",
+        "employee_name",
+        "week_start",
+        "weekly_regular_hours",
+        "hourly_rate",
+        "days",
+    )
+
+    def __init__(self, timesheet_id, employee_id, employee_name, week_start, weekly_regular_hours, hourly_rate):
+        self.timesheet_id = timesheet_id
+        self.employee_id = employee_id
+        self.employee_name = employee_name
+        self.week_start = week_start
+        self.weekly_regular_hours = weekly_regular_hours
+        self.hourly_rate = hourly_rate
+        self.days: list[DayPunches] = []
+
+    @property
+    def pk(self) -> int:
+        return self.timesheet_id
+
+    @property
+    def week_end(self):
+        return self.week_start + timedelta(days=6)
+
+    # Même API que WeeklyTimesheet
+    @property
+    def total_minutes(self) -> int:
+        return sum(d.total_minutes for d in self.days)
+
+    @property
+    def total_hours_decimal(self) -> Decimal:
+        return (Decimal(self.total_minutes) / Decimal(60)).quantize(Decimal("0.01"))
+
+    @property
+    def total_hours(self) -> float:
+        return float(self.total_hours_decimal)
+
+    @property
+    def regular_hours(self) -> Decimal:
+        return min(self.total_hours_decimal, self.weekly_regular_hours)
+
+    @property
+    def banked_hours(self) -> Decimal:
+        extra = self.total_hours_decimal - self.weekly_regular_hours
+        return extra if extra > 0 else Decimal("0.00")
+
+
+def _week_rows(timesheets):
+    return timesheets.values_list(
+        "pk",
+        "employee_id",
+        "employee__name",
+        "week_start",
+        "employee__weekly_regular_hours",
+        "employee__hourly_rate",
+    )
+
+
+def _entry_rows(timesheets, weeks: dict[int, WeekView]):
+    # Sous-requête plutôt qu'une longue liste IN, sauf si le queryset est paginé
+    ts_filter = list(weeks) if timesheets.query.is_sliced else timesheets.order_by().values("pk")
+    return (
+        DailyEntry.objects
+        .filter(timesheet_id__in=ts_filter)
+        .order_by("timesheet_id", "day_order")  # ordre de l'index: lundi ... dimanche sans tri Python
+        .values_list("timesheet_id", "day", *DailyEntry.TIME_FIELDS)
+    )
+
+
+def _attach_days(weeks: dict[int, WeekView], entry_rows) -> list[WeekView]:
+    for timesheet_id, *punches in entry_rows:
+        weeks[timesheet_id].days.append(DayPunches(*punches))
+    return list(weeks.values())
+
+
+def load_weeks(timesheets) -> list[WeekView]:
+    """
+    Construit les WeekView d'un queryset de WeeklyTimesheet, dans son ordre.
+    Deux requêtes au total: une pour les semaines, une pour toutes leurs entrées.
+    """
+    weeks = {row[0]: WeekView(*row) for row in _week_rows(timesheets)}
+    if not weeks:
+        return []
+    return _attach_days(weeks, _entry_rows(timesheets, weeks))
+
+
+async def aload_weeks(timesheets) -> list[WeekView]:
+    """Version asynchrone de load_weeks (ORM async, pour les vues ASGI)."""
+    weeks = {row[0]: WeekView(*row) async for row in _week_rows(timesheets)}
+    if not weeks:
+        return []
+    return _attach_days(weeks, [row async for row in _entry_rows(timesheets, weeks)])